@@ -0,0 +1,111 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from core.cache import is_shared
+
+USER_CACHE_TIMEOUT = getattr(settings, "ACCOUNTS_USER_CACHE_TIMEOUT", 60)
+
+# Upper bound on how stale a process's blacklist index can get, even if a
+# version bump never reaches it
+BLACKLIST_INDEX_TTL = getattr(settings, "ACCOUNTS_BLACKLIST_INDEX_TTL", 5)
+
+BLACKLIST_VERSION_KEY = "accounts:blacklist:version"
+
+
+def _user_key(user_id):
+    return f"accounts:user:{user_id}"
+
+
+# Users are only cached in a shared cache: a per-process copy would miss
+# invalidations from other workers and keep serving a deactivated user or
+# an old password hash.
+
+
+def get_user(user_id):
+    if not is_shared():
+        return None
+    return cache.get(_user_key(user_id))
+
+
+async def aget_user(user_id):
+    if not is_shared():
+        return None
+    return await cache.aget(_user_key(user_id))
+
+
+def set_user(user_id, user):
+    if is_shared():
+        cache.set(_user_key(user_id), user, timeout=USER_CACHE_TIMEOUT)
+
+
+async def aset_user(user_id, user):
+    if is_shared():
+        await cache.aset(_user_key(user_id), user, timeout=USER_CACHE_TIMEOUT)
+
+
+def invalidate_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+class BlacklistIndex:
+    """
+    In-process set of blacklisted, unexpired token JTIs.
+
+    Each process keeps its own copy and reloads it when the shared version
+    stamp in the cache changes (token_blacklist signals bump the stamp) or
+    after BLACKLIST_INDEX_TTL seconds, whichever comes first. A membership
+    check therefore costs one cache read instead of a query.
+
+    Without a shared cache other processes never see the stamp change, so
+    every check queries token_blacklist instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = None
+        self._jtis = frozenset()
+
+    def _current_version(self):
+        version = cache.get(BLACKLIST_VERSION_KEY)
+        if version is None:
+            cache.add(BLACKLIST_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(BLACKLIST_VERSION_KEY)
+        return version
+
+    def _load(self):
+        return frozenset(
+            BlacklistedToken.objects.filter(
+                token__expires_at__gt=timezone.now()
+            ).values_list("token__jti", flat=True)
+        )
+
+    def _is_stale(self, version):
+        return (
+            version != self._version
+            or time.monotonic() - self._loaded_at > BLACKLIST_INDEX_TTL
+        )
+
+    def __contains__(self, jti):
+        if not is_shared():
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        version = self._current_version()
+        if self._is_stale(version):
+            with self._lock:
+                if self._is_stale(version):
+                    self._jtis = self._load()
+                    self._version = version
+                    self._loaded_at = time.monotonic()
+        return jti in self._jtis
+
+    def invalidate(self):
+        cache.set(BLACKLIST_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+blacklist_index = BlacklistIndex()
@@ -0,0 +1,74 @@
+"""
+Password hashers with their cost read from settings.
+
+settings.ACCOUNTS_PASSWORD_HASHER picks the preferred one (first in
+PASSWORD_HASHERS): "scrypt" (default, stdlib), "argon2" (needs
+argon2-cffi) or "pbkdf2". Django re-hashes a password on the next
+successful login whenever it was stored by another hasher or with other
+parameters, so changing either setting upgrades users transparently.
+Measure candidates with ``manage.py bench_login``.
+"""
+
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Slack over scrypt's own n·r·p estimate when setting its memory limit
+SCRYPT_MEMORY_HEADROOM = 2**20
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return getattr(settings, "ACCOUNTS_SCRYPT_WORK_FACTOR", 2**14)
+
+    @property
+    def block_size(self):
+        return getattr(settings, "ACCOUNTS_SCRYPT_BLOCK_SIZE", 8)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "ACCOUNTS_SCRYPT_PARALLELISM", 1)
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # As Django's, but with maxmem fitted to these parameters (which may
+        # be a stored hash's, not the settings'): OpenSSL otherwise refuses
+        # anything over 32 MiB, i.e. the first step up from n=2**14, r=8.
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=128 * r * (n + p + 2) + SCRYPT_MEMORY_HEADROOM,
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode("ascii").strip()
+        return "%s$%d$%s$%d$%d$%s" % (self.algorithm, n, salt, r, p, hash_)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return getattr(settings, "ACCOUNTS_ARGON2_TIME_COST", 2)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, "ACCOUNTS_ARGON2_MEMORY_COST", 102400)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "ACCOUNTS_ARGON2_PARALLELISM", 8)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, "ACCOUNTS_PBKDF2_ITERATIONS", 1_000_000)
+
@@ -0,0 +1,127 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.benchmarks import rolled_back
+
+User = get_user_model()
+
+PASSWORD = "bench-login-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure jwt-obtain logins per second per core for each password "
+        "hasher in settings.PASSWORD_HASHER_CHOICES, using the configured "
+        "ACCOUNTS_* cost settings. Requests run one after another in this "
+        "process, so the rate is what one core sustains; everything written "
+        "is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument(
+            "--hasher",
+            action="append",
+            choices=list(settings.PASSWORD_HASHER_CHOICES),
+            help="Hasher to measure (repeatable); all available ones by default.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print results as JSON."
+        )
+
+    def handle(self, *args, **options):
+        names = options["hasher"] or [
+            name
+            for name, path in settings.PASSWORD_HASHER_CHOICES.items()
+            if self.available(path)
+        ]
+        for name in names:
+            if not self.available(settings.PASSWORD_HASHER_CHOICES[name]):
+                raise CommandError(f"The {name} hasher's library is not installed.")
+
+        with rolled_back():
+            results = [self.measure(name, options["requests"]) for name in names]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'hasher':<8} {'params':<48} {'hash ms':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'logins/s/core':>14}"
+        )
+        for result in results:
+            params = ", ".join(f"{k}={v}" for k, v in result["params"].items())
+            self.stdout.write(
+                f"{result['hasher']:<8} {params:<48} {result['hash_ms']:>8.2f} "
+                f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['logins_per_second']:>14.1f}"
+            )
+
+    def available(self, path):
+        with override_settings(PASSWORD_HASHERS=[path]):
+            hasher = get_hasher()
+            if hasher.library is None:
+                return True
+            try:
+                hasher._load_library()
+            except ValueError:
+                return False
+        return True
+
+    def measure(self, name, requests):
+        path = settings.PASSWORD_HASHER_CHOICES[name]
+        # Throttles would turn repeated logins into 429s
+        with override_settings(
+            PASSWORD_HASHERS=[path], DEBUG=False, THROTTLE_ROUTES={}
+        ):
+            user = User.objects.create_user(
+                email=f"bench-login-{name}@example.com",
+                password=PASSWORD,
+                username=f"bench-login-{name}",
+            )
+            decoded = get_hasher().decode(user.password)
+            params = {
+                key: value
+                for key, value in decoded.items()
+                if key not in ("algorithm", "hash", "salt")
+            }
+
+            hash_samples = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                check_password(PASSWORD, user.password)
+                hash_samples.append((time.perf_counter() - started) * 1000)
+
+            client = Client(HTTP_HOST="localhost", HTTP_ACCEPT="application/json")
+            url = reverse("jwt-obtain")
+            data = {"email": user.email, "password": PASSWORD}
+            response = client.post(url, data, content_type="application/json")
+            if response.status_code != 200:
+                raise CommandError(
+                    f"{name}: {response.status_code} {response.content[:200]!r}"
+                )
+            samples = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                client.post(url, data, content_type="application/json")
+                samples.append((time.perf_counter() - started) * 1000)
+
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        return {
+            "hasher": name,
+            "params": params,
+            "requests": requests,
+            "hash_ms": statistics.mean(hash_samples),
+            "p50_ms": cuts[49],
+            "p95_ms": cuts[94],
+            "logins_per_second": 1000 / statistics.mean(samples),
+        }
@@ -1,14 +1,23 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
 
 from django.contrib.auth import get_user_model
 
 from django.contrib.auth.password_validation import validate_password
+from django.utils.translation import gettext_lazy as _
+
+from core.metrics import TimedSerializerMixin
+
+from .cache import blacklist_index
+from .tokens import RefreshToken
 
 User = get_user_model()
 
 
-class PublicUserSerializer(serializers.ModelSerializer):
+class PublicUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["username", "email"]
@@ -43,3 +52,22 @@ class RegisterSerializer(serializers.ModelSerializer):
             password=validated_data["password"],
         )
         return user
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class TokenBlacklistSerializer(jwt_serializers.TokenBlacklistSerializer):
+    token_class = RefreshToken
+
+
+class TokenVerifySerializer(jwt_serializers.TokenVerifySerializer):
+    def validate(self, attrs):
+        token = UntypedToken(attrs["token"])
+        if (
+            api_settings.BLACKLIST_AFTER_ROTATION
+            and token.get(api_settings.JTI_CLAIM) in blacklist_index
+        ):
+            raise serializers.ValidationError(_("Token is blacklisted"))
+        return {}
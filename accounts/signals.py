@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import cache as user_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = getattr(instance, api_settings.USER_ID_FIELD)
+    user_cache.invalidate_user(user_id)
+    transaction.on_commit(lambda: user_cache.invalidate_user(user_id))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+@receiver(post_delete, sender=BlacklistedToken)
+def invalidate_blacklist_index(sender, **kwargs):
+    # Again after commit, so a reload racing the write sees the new row
+    user_cache.blacklist_index.invalidate()
+    transaction.on_commit(user_cache.blacklist_index.invalidate)
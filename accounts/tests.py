@@ -1,3 +1,184 @@
-from django.test import TestCase
+import json
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .cache import blacklist_index
+from .tokens import RefreshToken
+
+User = get_user_model()
+
+
+@override_settings(CACHE_SHARED=True)
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def test_authenticated_get_skips_user_query_once_cached(self):
+        url = reverse("profile")
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_saving_user_invalidates_cache(self):
+        url = reverse("profile")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+
+@override_settings(CACHE_SHARED=True)
+class BlacklistIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_revoked_refresh_token_is_rejected(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        response = self.client.post(reverse("jwt-refresh"), {"refresh": refresh})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(reverse("jwt-revoke"), {"refresh": refresh})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(reverse("jwt-refresh"), {"refresh": refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_does_not_query_blacklist_once_loaded(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        self.client.post(reverse("jwt-refresh"), {"refresh": refresh})
+        # Only the user lookup TokenRefreshSerializer does itself
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse("jwt-refresh"), {"refresh": refresh})
+        self.assertEqual(response.status_code, 200)
+
+    def test_verify_rejects_blacklisted_token(self):
+        refresh = RefreshToken.for_user(self.user)
+        url = reverse("jwt-verify")
+        with mock.patch.object(api_settings, "BLACKLIST_AFTER_ROTATION", True):
+            response = self.client.post(url, {"token": str(refresh)})
+            self.assertEqual(response.status_code, 200)
+            refresh.blacklist()
+            self.assertIn(refresh["jti"], blacklist_index)
+            response = self.client.post(url, {"token": str(refresh)})
+            self.assertEqual(response.status_code, 400)
+
+
+    def test_index_reloads_after_ttl_without_version_bump(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.assertNotIn(refresh["jti"], blacklist_index)
+        # Blacklisted by another process whose stamp bump we never saw
+        with mock.patch.object(blacklist_index, "invalidate"):
+            refresh.blacklist()
+        self.assertNotIn(refresh["jti"], blacklist_index)
+        with mock.patch("accounts.cache.time.monotonic", return_value=1e12):
+            self.assertIn(refresh["jti"], blacklist_index)
+
+
+@override_settings(CACHE_SHARED=False)
+class PerProcessCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_users_are_not_cached(self):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(client.get(reverse("profile")).status_code, 200)
+
+    def test_blacklist_is_checked_in_the_database(self):
+        refresh = RefreshToken.for_user(self.user)
+        with mock.patch.object(blacklist_index, "invalidate"):
+            refresh.blacklist()
+        with self.assertNumQueries(1):
+            self.assertIn(refresh["jti"], blacklist_index)
+
+
+@override_settings(ACCOUNTS_SCRYPT_WORK_FACTOR=2**10, ACCOUNTS_PBKDF2_ITERATIONS=1000)
+class PasswordHasherTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="hasher@example.com", password="pass", username="hasher"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self):
+        response = APIClient().post(
+            reverse("jwt-obtain"),
+            {"email": "hasher@example.com", "password": "pass"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        return get_hasher("default").decode(self.user.password)
+
+    def test_new_passwords_use_the_preferred_hasher(self):
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+
+    def test_login_upgrades_hashes_from_other_hashers(self):
+        self.user.password = make_password("pass", hasher="pbkdf2_sha256")
+        self.user.save()
+        self.assertEqual(self.login()["algorithm"], "scrypt")
+
+    def test_login_upgrades_hashes_with_other_costs(self):
+        with override_settings(ACCOUNTS_SCRYPT_WORK_FACTOR=2**11):
+            self.assertEqual(self.login()["work_factor"], 2**11)
+
+    def test_work_factors_above_openssls_default_memory_limit(self):
+        with override_settings(ACCOUNTS_SCRYPT_WORK_FACTOR=2**15):
+            self.assertEqual(self.login()["work_factor"], 2**15)
+        # A stored hash is verified with its own cost, not the settings'
+        self.assertTrue(self.user.check_password("pass"))
+
+    def test_bench_login(self):
+        out = StringIO()
+        call_command(
+            "bench_login",
+            requests=2,
+            hasher=["scrypt", "pbkdf2"],
+            json=True,
+            stdout=out,
+        )
+        results = json.loads(out.getvalue())
+        self.assertEqual([r["hasher"] for r in results], ["scrypt", "pbkdf2"])
+        self.assertEqual(results[1]["params"], {"iterations": 1000})
+        self.assertEqual(User.objects.count(), 1)
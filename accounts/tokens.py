@@ -0,0 +1,17 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import blacklist_index
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    RefreshToken whose blacklist check uses the in-process blacklist index
+    instead of querying token_blacklist.
+    """
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in blacklist_index:
+            raise TokenError(_("Token is blacklisted"))
@@ -1,14 +1,21 @@
 from django.contrib import admin
-from .models import BlogEntry, Comment
+from .models import BlogEntry, Comment, Task
 
 
 @admin.register(BlogEntry)
 class BlogEntryAdmin(admin.ModelAdmin):
-    list_display = ("title", "author", "status", "created_at", "updated_at")
+    list_display = (
+        "title",
+        "author",
+        "status",
+        "comment_count",
+        "created_at",
+        "updated_at",
+    )
     list_filter = ("status", "created_at", "updated_at", "author__username")
     search_fields = ("title", "content", "author__username")
     prepopulated_fields = {"slug": ("title",)}
-    readonly_fields = ("short_url_id", "created_at", "updated_at")
+    readonly_fields = ("short_url_id", "comment_count", "created_at", "updated_at")
     date_hierarchy = "created_at"
     # filter_horizontal = ("tags",)
 
@@ -19,3 +26,11 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ("created_at", "updated_at", "author__username")
     search_fields = ("content", "author__username")
     readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("key", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("status", "name")
+    search_fields = ("key",)
+    readonly_fields = ("created_at", "updated_at")
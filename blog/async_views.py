@@ -0,0 +1,244 @@
+"""
+Native async read handlers for ASGI deployments.
+
+GET/HEAD on the entry detail, entry list and comment list routes are served
+by these coroutines when BLOG_ASYNC_READS is set (core/asgi.py sets it);
+other methods still go to the DRF viewsets. JWT authentication and the
+viewsets' permission and throttle classes run inline, and queries go
+through Django's async ORM. Lists take the BLOG_FAST_READS path exactly
+when the viewsets do. DRF's cursor paginator is synchronous, so each page
+query runs in a single sync_to_async call, the same way the async ORM runs
+queries today.
+
+Responses match the sync views byte for byte (see AsyncReadTests).
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import (
+    APIException,
+    NotAuthenticated,
+    PermissionDenied,
+    Throttled,
+)
+from rest_framework.request import Request
+
+from accounts.authentication import AsyncJWTAuthentication
+from core.renderers import FastJSONRenderer
+
+from . import cache as entry_cache
+from . import fastpath
+from .conditional import (
+    aconditional_response,
+    acomment_list_validators,
+    aentry_list_validators,
+    entry_validators,
+)
+from .models import BlogEntry, Comment
+from .pagination import BlogEntryCursorPagination, CommentCursorPagination
+from .serializers import (
+    BlogEntryListSerializer,
+    BlogEntrySerializer,
+    CommentSerializer,
+    is_selected,
+    parse_sparse_fieldset,
+)
+from .views import ENTRY_LOOKUPS, BlogEntryViewSet, CommentViewSet, visible_entries
+
+authenticator = AsyncJWTAuthentication()
+renderer = FastJSONRenderer()
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        renderer.render(data), status=status, content_type="application/json"
+    )
+
+
+def error_response(request, exc):
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {"detail": exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if exc.status_code == 401:
+        response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+    if getattr(exc, "wait", None):
+        response["Retry-After"] = "%d" % exc.wait
+    return response
+
+
+def permission_denied(request, permission):
+    if not request.user.is_authenticated:
+        raise NotAuthenticated()
+    raise PermissionDenied(
+        getattr(permission, "message", None), getattr(permission, "code", None)
+    )
+
+
+def check_permissions(request, viewset):
+    """Run ``viewset``'s permission classes the way DRF's APIView does."""
+    for permission in (cls() for cls in viewset.permission_classes):
+        if not permission.has_permission(request, None):
+            permission_denied(request, permission)
+
+
+def check_object_permissions(request, viewset, obj):
+    for permission in (cls() for cls in viewset.permission_classes):
+        if not permission.has_object_permission(request, None, obj):
+            permission_denied(request, permission)
+
+
+def check_throttles(request, viewset):
+    """Run ``viewset``'s throttle classes (RouteThrottle) the way DRF does."""
+    waits = [
+        throttle.wait()
+        for throttle in (cls() for cls in viewset.throttle_classes)
+        if not throttle.allow_request(request, None)
+    ]
+    if waits:
+        raise Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+
+def async_read(viewset):
+    """
+    Authenticate, then check ``viewset``'s permissions and throttles and
+    run the decorated handler, turning DRF exceptions and Http404 into the
+    same JSON errors DRF would send.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def view(request, *args, **kwargs):
+            try:
+                result = await authenticator.aauthenticate(request)
+                request.user = result[0] if result else AnonymousUser()
+                check_permissions(request, viewset)
+                check_throttles(request, viewset)
+                return await handler(request, *args, **kwargs)
+            except Http404 as exc:
+                return json_response({"detail": str(exc)}, status=404)
+            except APIException as exc:
+                return error_response(request, exc)
+
+        return view
+
+    return decorator
+
+
+def with_async_reads(async_read_view, sync_view):
+    """
+    Route GET/HEAD to ``async_read_view`` and everything else to the sync
+    DRF view, when BLOG_ASYNC_READS is enabled.
+    """
+    if not getattr(settings, "BLOG_ASYNC_READS", False):
+        return sync_view
+    async_sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return await async_read_view(request, *args, **kwargs)
+        return await async_sync_view(request, *args, **kwargs)
+
+    # Keep DRF's view attributes (cls, actions, csrf_exempt) for schema
+    # generation and CSRF handling.
+    functools.update_wrapper(view, sync_view)
+    return csrf_exempt(view)
+
+
+def sparse(data, fieldset):
+    return {k: v for k, v in data.items() if is_selected(k, fieldset)}
+
+
+@async_read(BlogEntryViewSet)
+async def entry_detail(request, **kwargs):
+    lookup = next(name for name in ENTRY_LOOKUPS if name in kwargs)
+    value = kwargs[lookup]
+    fieldset = parse_sparse_fieldset(request.GET)
+
+    cached = await entry_cache.aget_entry(lookup, value)
+    if cached is not None and (
+        cached["status"] == "PUBLIC" or cached["author_id"] == request.user.pk
+    ):
+
+        async def cached_response():
+            return json_response(sparse(cached["data"], fieldset))
+
+        return await aconditional_response(request, cached["etag"], cached_response)
+
+    entry = await aget_object_or_404(visible_entries(request.user), **{lookup: value})
+    check_object_permissions(request, BlogEntryViewSet, entry)
+    etag = entry_validators(entry)
+
+    async def build_response():
+        data = BlogEntrySerializer(entry).data
+        await entry_cache.aset_entry(entry, data)
+        return json_response(sparse(data, fieldset))
+
+    return await aconditional_response(request, etag, build_response)
+
+
+@async_read(BlogEntryViewSet)
+async def entry_list(request):
+    queryset = visible_entries(request.user)
+    etag = await aentry_list_validators(queryset, Request(request))
+    fieldset = parse_sparse_fieldset(request.GET)
+
+    async def build_response():
+        paginator = BlogEntryCursorPagination()
+        if not fastpath.enabled():
+            page = await sync_to_async(paginator.paginate_queryset)(
+                queryset, Request(request)
+            )
+            data = BlogEntryListSerializer(
+                page, many=True, context={"sparse_fieldset": fieldset}
+            ).data
+            return json_response(paginator.get_paginated_response(data).data)
+
+        builder = fastpath.entry_list_builder(fieldset)
+        page = await sync_to_async(paginator.paginate_queryset)(
+            builder.values(queryset, "id", "created_at"), Request(request)
+        )
+        rows = await fastpath.aattach_tags(
+            builder.rows(page), [values["id"] for values in page], BlogEntry
+        )
+        return json_response(paginator.get_paginated_response(rows).data)
+
+    return await aconditional_response(request, etag, build_response)
+
+
+@async_read(CommentViewSet)
+async def comment_list(request, **kwargs):
+    kwarg = next(name for name in CommentViewSet.entry_lookups if name in kwargs)
+    entry = await aget_object_or_404(
+        BlogEntry.objects.visible_to(request.user).only("pk"),
+        **{CommentViewSet.entry_lookups[kwarg]: kwargs[kwarg]},
+    )
+    queryset = Comment.objects.filter(blog_entry_id=entry.pk)
+    etag = await acomment_list_validators(queryset, Request(request))
+    fieldset = parse_sparse_fieldset(request.GET)
+
+    async def build_response():
+        paginator = CommentCursorPagination()
+        if not fastpath.enabled():
+            page = await sync_to_async(paginator.paginate_queryset)(
+                queryset.select_related("author"), Request(request)
+            )
+            data = CommentSerializer(
+                page, many=True, context={"sparse_fieldset": fieldset}
+            ).data
+            return json_response(paginator.get_paginated_response(data).data)
+
+        builder = fastpath.comment_builder(fieldset)
+        page = await sync_to_async(paginator.paginate_queryset)(
+            builder.values(queryset, "comment_number"), Request(request)
+        )
+        return json_response(paginator.get_paginated_response(builder.rows(page)).data)
+
+    return await aconditional_response(request, etag, build_response)
@@ -0,0 +1,234 @@
+"""
+Batched NDJSON import of entries with their tags and comments.
+
+Each line holds one entry::
+
+    {"title": "...", "content": "...", "status": "PUBLIC", "tags": ["a"],
+     "author": "username", "created_at": "2020-01-01T00:00:00Z",
+     "comments": [{"author": "username", "content": "...", "created_at": ...}]}
+
+Valid records are inserted ``batch_size`` at a time with bulk_create inside
+one transaction per batch. Slugs, short ids and comment numbers are
+allocated in bulk. Invalid records are reported with their line number
+and skipped.
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from taggit.models import Tag, TaggedItem
+
+from . import rendering
+from .feeds import invalidate_all_feeds
+from .models import BlogEntry, Comment
+from .search import update_search_vectors
+from .serializers import BulkEntrySerializer
+from .short_ids import get_short_id_generator
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class EntryImporter:
+    """
+    ``default_author`` is used for records and comments without an author.
+    Unless ``allow_other_authors`` is set, records naming anyone else are
+    rejected.
+    """
+
+    def __init__(
+        self, default_author=None, allow_other_authors=False, batch_size=None
+    ):
+        self.default_author = default_author
+        self.allow_other_authors = allow_other_authors
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.entries = 0
+        self.comments = 0
+        self.errors = []
+
+    @property
+    def result(self):
+        return {
+            "entries": self.entries,
+            "comments": self.comments,
+            "errors": self.errors,
+        }
+
+    def error(self, line, errors):
+        self.errors.append({"line": line, "errors": errors})
+
+    def run(self, lines):
+        batch = []
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                self.error(line_number, {"non_field_errors": [f"Invalid JSON: {exc}"]})
+                continue
+            serializer = BulkEntrySerializer(data=record)
+            if not serializer.is_valid():
+                self.error(line_number, serializer.errors)
+                continue
+            batch.append((line_number, serializer.validated_data))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        if self.entries:
+            invalidate_all_feeds()
+        return self.result
+
+    def resolve_authors(self, batch):
+        """
+        Replace author usernames with users, dropping records that name an
+        unknown or disallowed author.
+        """
+        usernames = set()
+        for _, record in batch:
+            usernames.add(record.get("author"))
+            usernames.update(c.get("author") for c in record["comments"])
+        usernames.discard(None)
+        users = {u.username: u for u in User.objects.filter(username__in=usernames)}
+
+        def resolve(username):
+            if username is None:
+                if self.default_author is None:
+                    raise ValueError("This field is required.")
+                return self.default_author
+            if (
+                not self.allow_other_authors
+                and username != getattr(self.default_author, "username", None)
+            ):
+                raise ValueError("You may only import as yourself.")
+            if username not in users:
+                raise ValueError(f"Unknown user {username!r}.")
+            return users[username]
+
+        resolved = []
+        for line, record in batch:
+            try:
+                record["author"] = resolve(record.get("author"))
+                for comment in record["comments"]:
+                    comment["author"] = resolve(comment.get("author"))
+            except ValueError as exc:
+                self.error(line, {"author": [str(exc)]})
+                continue
+            resolved.append((line, record))
+        return resolved
+
+    def import_batch(self, batch):
+        batch = self.resolve_authors(batch)
+        if not batch:
+            return
+        try:
+            with transaction.atomic():
+                entries, comments = self.bulk_insert([r for _, r in batch])
+        except IntegrityError:
+            # A concurrent writer claimed one of the allocated slugs; insert
+            # the batch row by row so only genuinely bad rows are rejected.
+            for line, record in batch:
+                try:
+                    with transaction.atomic():
+                        entries, comments = self.bulk_insert([record])
+                except IntegrityError as exc:
+                    self.error(line, {"non_field_errors": [str(exc)]})
+                    continue
+                self.entries += entries
+                self.comments += comments
+            return
+        self.entries += entries
+        self.comments += comments
+
+    def bulk_insert(self, records):
+        # Allocate per slug, not per title: "Hello World" and "hello world!"
+        # both want hello-world and must draw from the same sequence.
+        bases = [BlogEntry.base_slug(record["title"]) for record in records]
+        titles = {}
+        for base, record in zip(bases, records):
+            titles.setdefault(base, []).append(record["title"])
+        slugs = {
+            base: iter(BlogEntry.allocate_slugs(group[0], len(group)))
+            for base, group in titles.items()
+        }
+        short_ids = iter(get_short_id_generator().generate_many(len(records)))
+
+        entries = BlogEntry.objects.bulk_create(
+            [
+                BlogEntry(
+                    title=record["title"],
+                    slug=next(slugs[base]),
+                    short_url_id=next(short_ids),
+                    content=record["content"],
+                    excerpt=BlogEntry.make_excerpt(record["content"]),
+                    content_html=rendering.render(record["content"]),
+                    content_html_version=rendering.RENDERER_VERSION,
+                    author=record["author"],
+                    status=record["status"],
+                    next_comment_number=len(record["comments"]) + 1,
+                    comment_count=len(record["comments"]),
+                )
+                for base, record in zip(bases, records)
+            ]
+        )
+
+        comments = []
+        for entry, record in zip(entries, records):
+            for number, comment in enumerate(record["comments"], start=1):
+                comments.append(
+                    Comment(
+                        blog_entry=entry,
+                        author=comment["author"],
+                        content=comment["content"],
+                        content_html=rendering.render(comment["content"]),
+                        content_html_version=rendering.RENDERER_VERSION,
+                        comment_number=number,
+                    )
+                )
+        Comment.objects.bulk_create(comments)
+
+        # auto_now_add overrides created_at on insert, so restore imported
+        # timestamps afterwards.
+        self.restore_created_at(entries, [r.get("created_at") for r in records])
+        self.restore_created_at(
+            comments,
+            [c.get("created_at") for r in records for c in r["comments"]],
+        )
+
+        self.tag(entries, [record["tags"] for record in records])
+        update_search_vectors(BlogEntry.objects.filter(pk__in=[e.pk for e in entries]))
+        return len(entries), len(comments)
+
+    def restore_created_at(self, objects, timestamps):
+        changed = []
+        for obj, created_at in zip(objects, timestamps):
+            if created_at is not None:
+                obj.created_at = created_at
+                changed.append(obj)
+        if changed:
+            type(changed[0]).objects.bulk_update(changed, ["created_at"])
+
+    def tag(self, entries, tag_lists):
+        names = {name for tags in tag_lists for name in tags}
+        if not names:
+            return
+        tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+        for name in names - tags.keys():
+            tags[name] = Tag.objects.create(name=name)
+        content_type = ContentType.objects.get_for_model(BlogEntry)
+        TaggedItem.objects.bulk_create(
+            [
+                TaggedItem(content_type=content_type, object_id=entry.pk, tag=tags[name])
+                for entry, entry_tags in zip(entries, tag_lists)
+                for name in set(entry_tags)
+            ]
+        )
+
+
+def import_entries(lines, **kwargs):
+    return EntryImporter(**kwargs).run(lines)
@@ -0,0 +1,134 @@
+"""
+Cache of serialized entries, keyed by pk with slug and short URL lookups.
+
+Saves, deletes and the bulk management commands invalidate through the
+default cache, so it must be shared between processes (see core.cache):
+with a per-process backend a running server keeps serving its own copy
+until ENTRY_CACHE_TIMEOUT. Hits and misses are counted per process in the
+metrics registry and exported on /metrics as cache_lookups_total.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from core.db import pin_seconds
+from core.metrics import registry
+
+from .conditional import entry_validators
+
+ENTRY_CACHE_TIMEOUT = getattr(settings, "BLOG_ENTRY_CACHE_TIMEOUT", 300)
+CACHEABLE_STATUSES = ("PUBLIC", "UNLISTED")
+
+# URL kwarg -> serialized field holding the same value
+LOOKUP_FIELDS = {
+    "pk": "id",
+    "slug": "slug",
+    "short_url_id": "short_url_id",
+}
+
+
+def _lookup_key(lookup, value):
+    return f"blog:entry:{lookup}:{value}"
+
+
+def _entry_key(pk):
+    return f"blog:entry:data:{pk}"
+
+
+def _written_key(pk):
+    return f"blog:entry:written:{pk}"
+
+
+# Label of this cache in the metrics registry
+METRICS_NAME = "blog_entry"
+
+PER_PROCESS_WARNING = (
+    "The default cache is per-process, so running servers keep serving "
+    "their cached entries and feeds until those expire."
+)
+
+
+def _is_hit(payload, lookup, value):
+    return payload is not None and str(
+        payload["data"][LOOKUP_FIELDS[lookup]]
+    ) == str(value)
+
+
+def get_entry(lookup, value):
+    """
+    Return the cached payload for an entry looked up by pk, slug or
+    short_url_id, or None on a miss.
+
+    Lookups map to the entry pk, and the serialized entry is stored once
+    per pk, so invalidation only needs the pk. A payload whose slug or
+    short URL no longer matches the lookup is treated as a miss.
+    """
+    pk = value if lookup == "pk" else cache.get(_lookup_key(lookup, value))
+    payload = cache.get(_entry_key(pk)) if pk is not None else None
+    hit = _is_hit(payload, lookup, value)
+    registry.cache_lookup(METRICS_NAME, hit)
+    return payload if hit else None
+
+
+async def aget_entry(lookup, value):
+    """
+    Async version of get_entry, using the cache backend's async API.
+    """
+    pk = value if lookup == "pk" else await cache.aget(_lookup_key(lookup, value))
+    payload = await cache.aget(_entry_key(pk)) if pk is not None else None
+    hit = _is_hit(payload, lookup, value)
+    registry.cache_lookup(METRICS_NAME, hit)
+    return payload if hit else None
+
+
+def _entry_items(entry, data):
+    etag = entry_validators(entry)
+    payload = {
+        "author_id": entry.author_id,
+        "status": entry.status,
+        "etag": etag,
+        "data": dict(data),
+    }
+    return {
+        _entry_key(entry.pk): payload,
+        _lookup_key("slug", entry.slug): entry.pk,
+        _lookup_key("short_url_id", entry.short_url_id): entry.pk,
+    }
+
+
+def _from_replica(entry):
+    return entry._state.db not in (None, DEFAULT_DB_ALIAS)
+
+
+def set_entry(entry, data):
+    """
+    Cache the serialized representation of a PUBLIC or UNLISTED entry.
+
+    An entry read from a replica shortly after it was written may be stale,
+    so it isn't cached until the replica pin window has passed.
+    """
+    if entry.status not in CACHEABLE_STATUSES:
+        return
+    if _from_replica(entry) and cache.get(_written_key(entry.pk)):
+        return
+    cache.set_many(_entry_items(entry, data), timeout=ENTRY_CACHE_TIMEOUT)
+
+
+async def aset_entry(entry, data):
+    if entry.status not in CACHEABLE_STATUSES:
+        return
+    if _from_replica(entry) and await cache.aget(_written_key(entry.pk)):
+        return
+    await cache.aset_many(_entry_items(entry, data), timeout=ENTRY_CACHE_TIMEOUT)
+
+
+def invalidate_entry(pk):
+    cache.set(_written_key(pk), True, timeout=pin_seconds())
+    cache.delete(_entry_key(pk))
+
+
+def invalidate_entries(pks):
+    cache.set_many(dict.fromkeys(map(_written_key, pks), True), timeout=pin_seconds())
+    cache.delete_many([_entry_key(pk) for pk in pks])
+
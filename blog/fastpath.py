@@ -0,0 +1,144 @@
+"""
+Serializer-free read path for entry and comment endpoints.
+
+Rows are built straight from values() dicts, skipping per-row serializer
+field objects. The output must stay identical to BlogEntryListSerializer
+and CommentSerializer (see FastReadTests); each serializer field maps to a
+values() path plus an optional conversion. Toggle with BLOG_FAST_READS.
+"""
+
+from operator import attrgetter
+
+from django.conf import settings
+from rest_framework import serializers
+from taggit.models import TaggedItem
+
+from core.metrics import serializer_timer
+
+from .serializers import BlogEntryListSerializer, CommentSerializer, is_selected
+
+_datetime = serializers.DateTimeField().to_representation
+
+# Serializer field -> (values() path, conversion)
+ENTRY_LIST_COLUMNS = {
+    "id": ("id", None),
+    "title": ("title", None),
+    "slug": ("slug", None),
+    "short_url_id": ("short_url_id", None),
+    "excerpt": ("excerpt", None),
+    "author": ("author__username", None),
+    "status": ("status", None),
+    "created_at": ("created_at", _datetime),
+    "updated_at": ("updated_at", _datetime),
+    "tags": (None, None),  # filled in by attach_tags
+    "comment_count": ("comment_count", None),
+}
+
+COMMENT_COLUMNS = {
+    "id": ("id", None),
+    "blog_entry": ("blog_entry_id", None),
+    "comment_number": ("comment_number", None),
+    "author": ("author__username", None),
+    "content": ("content", None),
+    "content_html": ("content_html", None),
+    "created_at": ("created_at", _datetime),
+    "updated_at": ("updated_at", _datetime),
+}
+
+
+def enabled():
+    return getattr(settings, "BLOG_FAST_READS", True)
+
+
+class RowBuilder:
+    def __init__(self, serializer_class, columns, fieldset=None):
+        self.columns = columns
+        self.fields = [
+            name
+            for name in serializer_class.Meta.fields
+            if fieldset is None or is_selected(name, fieldset)
+        ]
+
+    @property
+    def paths(self):
+        return [
+            self.columns[name][0]
+            for name in self.fields
+            if self.columns[name][0] is not None
+        ]
+
+    def values(self, queryset, *extra):
+        """
+        ``queryset`` as values() dicts holding the selected columns plus
+        ``extra`` paths (e.g. the pagination ordering).
+        """
+        return queryset.prefetch_related(None).values(*{*self.paths, *extra})
+
+    def row(self, values):
+        row = {}
+        for name in self.fields:
+            path, convert = self.columns[name]
+            if path is None:
+                row[name] = None
+                continue
+            value = values[path]
+            row[name] = convert(value) if convert is not None else value
+        return row
+
+    def rows(self, values):
+        with serializer_timer():
+            return [self.row(v) for v in values]
+
+    def instance_row(self, instance):
+        with serializer_timer():
+            return self.row(
+                {
+                    path: attrgetter(path.replace("__", "."))(instance)
+                    for path in self.paths
+                }
+            )
+
+
+def entry_list_builder(fieldset=None):
+    return RowBuilder(BlogEntryListSerializer, ENTRY_LIST_COLUMNS, fieldset)
+
+
+def comment_builder(fieldset=None):
+    return RowBuilder(CommentSerializer, COMMENT_COLUMNS, fieldset)
+
+
+def _tag_pairs(entry_ids, model):
+    # Mirrors taggit's prefetch query so tag order matches the serializer
+    relname = TaggedItem.tag_relname()
+    return TaggedItem.tags_for(
+        model, **{f"{relname}__object_id__in": entry_ids}
+    ).values_list(f"{relname}__object_id", "name")
+
+
+def _fill_tags(rows, entry_ids, pairs):
+    tags = {}
+    for object_id, name in pairs:
+        tags.setdefault(object_id, []).append(name)
+    for row, entry_id in zip(rows, entry_ids):
+        row["tags"] = tags.get(entry_id, [])
+    return rows
+
+
+def wants_tags(rows):
+    return bool(rows) and "tags" in rows[0]
+
+
+def attach_tags(rows, entry_ids, model):
+    """
+    Fill each row's "tags" with one query.
+    """
+    if not wants_tags(rows):
+        return rows
+    return _fill_tags(rows, entry_ids, _tag_pairs(entry_ids, model))
+
+
+async def aattach_tags(rows, entry_ids, model):
+    if not wants_tags(rows):
+        return rows
+    pairs = [pair async for pair in _tag_pairs(entry_ids, model)]
+    return _fill_tags(rows, entry_ids, pairs)
@@ -0,0 +1,219 @@
+"""
+RSS and Atom feeds of PUBLIC entries: site-wide, per author and per tag.
+
+Rendered feed bodies are cached with their validators, so polling an
+unchanged feed costs two cache reads and no queries, and a matching
+If-None-Match gets a 304. Signals drop the cached
+feeds an entry appears in (or just left) when it changes; the next poll
+rebuilds them. Bulk operations and user edits (feeds show author names)
+bump a generation number instead, which retires every cached feed at once.
+The short BLOG_FEED_CACHE_TIMEOUT bounds staleness where the cache is not
+shared between processes.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from taggit.models import Tag, TaggedItem
+
+from core.db import reading_from_primary
+
+from .conditional import conditional_response, make_etag
+from .models import BlogEntry
+
+User = get_user_model()
+
+FEED_ITEMS = getattr(settings, "BLOG_FEED_ITEMS", 20)
+FEED_CACHE_TIMEOUT = getattr(settings, "BLOG_FEED_CACHE_TIMEOUT", 300)
+
+SITE, AUTHOR, TAG = "site", "author", "tag"
+FORMATS = ("rss", "atom")
+
+# URL kwarg naming each scope's object
+SCOPE_KWARGS = {SITE: None, AUTHOR: "username", TAG: "tag"}
+
+GENERATION_KEY = "blog:feed:generation"
+
+
+def _feed_key(generation, scope, value, feed_format):
+    return f"blog:feed:{generation}:{scope}:{value}:{feed_format}"
+
+
+class EntryFeed(Feed):
+    feed_type = Rss201rev2Feed
+    feed_format = "rss"
+
+    def __init__(self, scope=SITE):
+        self.scope = scope
+
+    def get_object(self, request, username=None, tag=None):
+        if self.scope == AUTHOR:
+            return User.objects.only("pk", "username").get(username=username)
+        if self.scope == TAG:
+            return Tag.objects.get(slug=tag)
+        return None
+
+    def title(self, obj):
+        if self.scope == AUTHOR:
+            return f"Entries by {obj.username}"
+        if self.scope == TAG:
+            return f"Entries tagged {obj.name}"
+        return "Latest entries"
+
+    def link(self, obj):
+        return reverse("entry-list")
+
+    def description(self, obj):
+        return f"The {FEED_ITEMS} most recent public entries."
+
+    def items(self, obj):
+        entries = BlogEntry.objects.visible_to(None)
+        if self.scope == AUTHOR:
+            entries = entries.filter(author=obj)
+        elif self.scope == TAG:
+            entries = entries.filter(tags=obj)
+        return (
+            entries.select_related("author")
+            .prefetch_related("tags")
+            .defer("content", "search_vector")[:FEED_ITEMS]
+        )
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.content_html
+
+    def item_link(self, item):
+        # Not the slug: titles in non-Latin scripts slugify to ""
+        return reverse("entry-by-short-url", args=[item.short_url_id])
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_categories(self, item):
+        return [tag.name for tag in item.tags.all()]
+
+
+class AtomEntryFeed(EntryFeed):
+    feed_type = Atom1Feed
+    feed_format = "atom"
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def _build(feed, request, kwargs):
+    response = feed(request, **kwargs)
+    return {
+        "body": response.content,
+        "content_type": response["Content-Type"],
+        "etag": make_etag(hashlib.sha1(response.content).hexdigest()),
+    }
+
+
+def feed_view(scope, feed_format):
+    """
+    View serving one kind of feed from the cache, building it (and raising
+    404 for unknown authors and tags) only on a miss.
+    """
+    feed = (AtomEntryFeed if feed_format == "atom" else EntryFeed)(scope)
+    kwarg = SCOPE_KWARGS[scope]
+
+    def view(request, **kwargs):
+        value = kwargs[kwarg] if kwarg else ""
+        key = _feed_key(cache.get(GENERATION_KEY, 0), scope, value, feed_format)
+        payload = cache.get(key)
+        if payload is None:
+            # Cached until the next invalidation: don't build from a replica
+            # that may not have the change yet.
+            with reading_from_primary():
+                payload = _build(feed, request, kwargs)
+            cache.set(key, payload, timeout=FEED_CACHE_TIMEOUT)
+        return conditional_response(
+            request,
+            payload["etag"],
+            lambda: HttpResponse(
+                payload["body"], content_type=payload["content_type"]
+            ),
+        )
+
+    return view
+
+
+def invalidate_feeds(authors=(), tags=()):
+    """
+    Drop the cached site feed and the feeds of the given usernames and tag
+    slugs, now and again once the transaction commits.
+    """
+    generation = cache.get(GENERATION_KEY, 0)
+    scopes = [(SITE, "")]
+    scopes += [(AUTHOR, username) for username in authors]
+    scopes += [(TAG, slug) for slug in tags]
+    keys = [
+        _feed_key(generation, scope, value, feed_format)
+        for scope, value in scopes
+        for feed_format in FORMATS
+    ]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        cache.incr(GENERATION_KEY)
+
+
+def invalidate_all_feeds():
+    """Retire every cached feed, for bulk imports, re-renders and renames."""
+    _bump_generation()
+    transaction.on_commit(_bump_generation)
+
+
+def in_feeds(entry):
+    """
+    Whether a change to ``entry`` can affect any feed: it is PUBLIC now or
+    was when loaded (or its loaded status is unknown).
+    """
+    loaded = getattr(entry, "_loaded_status", entry.status)
+    return loaded is None or "PUBLIC" in (entry.status, loaded)
+
+
+def invalidate_entry_feeds(entry, tags=None):
+    """
+    Drop the feeds ``entry`` belongs to: the site feed, its author's (old
+    and new, if it changed hands) and those of ``tags``, by default the
+    entry's current tags.
+    """
+    author_ids = {entry.author_id, getattr(entry, "_loaded_author_id", None)}
+    author_ids.discard(None)
+    if author_ids == {entry.author_id} and BlogEntry.author.is_cached(entry):
+        authors = [entry.author.username]
+    else:
+        authors = User.objects.filter(pk__in=author_ids).values_list(
+            "username", flat=True
+        )
+    if tags is None:
+        # Not entry.tags: the entry serializer may have set it to a plain list
+        tags = TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(BlogEntry),
+            object_id=entry.pk,
+        ).values_list("tag__slug", flat=True)
+    invalidate_feeds(authors=list(authors), tags=list(tags))
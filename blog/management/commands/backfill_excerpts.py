@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.models import BlogEntry
+
+
+class Command(BaseCommand):
+    help = "Recompute BlogEntry.excerpt from content for every entry."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                BlogEntry.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "content", "excerpt")[:batch_size]
+            )
+            if not batch:
+                break
+            now = timezone.now()
+            for entry in batch:
+                entry.excerpt = BlogEntry.make_excerpt(entry.content)
+                # bulk_update skips auto_now; ETags and exports key on it
+                entry.updated_at = now
+            with transaction.atomic():
+                BlogEntry.objects.bulk_update(batch, ["excerpt", "updated_at"])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} excerpts."))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from blog import cache as entry_cache
+from blog.models import BlogEntry
+from blog.short_ids import ALPHABET, WIDTH, get_short_id_generator
+from core.cache import is_shared
+
+
+class Command(BaseCommand):
+    help = (
+        "Assign generator-issued short URL ids to entries that have none. "
+        "With --legacy, also replace hash-based ids; their old short links "
+        "stop resolving."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--legacy",
+            action="store_true",
+            help="Also re-key entries whose id was not issued by the generator.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        condition = Q(short_url_id="")
+        if options["legacy"]:
+            condition |= ~Q(short_url_id__regex=rf"^[{ALPHABET}]{{{WIDTH}}}$")
+        queryset = BlogEntry.objects.filter(condition).order_by("pk")
+
+        if options["dry_run"]:
+            self.stdout.write(f"{queryset.count()} entries would be re-keyed.")
+            return
+
+        generator = get_short_id_generator()
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).only("pk", "short_url_id")[
+                    : options["batch_size"]
+                ]
+            )
+            if not batch:
+                break
+            now = timezone.now()
+            for entry, short_url_id in zip(
+                batch, generator.generate_many(len(batch))
+            ):
+                entry.short_url_id = short_url_id
+                # bulk_update skips auto_now; ETags and exports key on it
+                entry.updated_at = now
+            with transaction.atomic():
+                BlogEntry.objects.bulk_update(batch, ["short_url_id", "updated_at"])
+            for entry in batch:
+                entry_cache.invalidate_entry(entry.pk)
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"{updated} entries re-keyed...")
+
+        self.stdout.write(self.style.SUCCESS(f"Re-keyed {updated} entries."))
+        if updated and not is_shared():
+            self.stderr.write(self.style.WARNING(entry_cache.PER_PROCESS_WARNING))
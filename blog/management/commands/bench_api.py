@@ -0,0 +1,340 @@
+import itertools
+import json
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from blog.models import BlogEntry
+from core.benchmarks import rolled_back
+
+User = get_user_model()
+
+PASSWORD = "bench-api-password"
+
+
+class Case:
+    """
+    One benchmarked route. ``request`` is called with the iteration number
+    and returns (url, data) so write cases can target fresh rows.
+    """
+
+    def __init__(self, name, method, request, auth=None, prepare=None):
+        self.name = name
+        self.method = method
+        self.request = request
+        self.auth = auth
+        self.prepare = prepare
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every blog route and the JWT endpoints against the "
+        "configured database (Postgres, or SQLite with DB_ENGINE=sqlite), "
+        "reporting latency percentiles and queries per request. "
+        "Run seed_data first; everything written here is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument(
+            "--only", default="", help="Comma-separated case names to run."
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print results as JSON."
+        )
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            results = self.run(options)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'case':<30} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'max ms':>8} {'queries':>8}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['case']:<30} {result['requests']:>5} "
+                f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['max_ms']:>8.2f} "
+                f"{result['queries']:>8.1f}"
+            )
+
+    def run(self, options):
+        entry = (
+            BlogEntry.objects.filter(status="PUBLIC", comment_count__gt=0)
+            .order_by("-created_at")
+            .first()
+        )
+        if entry is None:
+            raise CommandError(
+                "No public entry with comments found; run seed_data first."
+            )
+        user = User.objects.create_user(
+            email="bench-api@example.com",
+            password=PASSWORD,
+            username="bench-api",
+            is_staff=True,
+        )
+        only = {name for name in options["only"].split(",") if name}
+        results = []
+        for case in self.cases(entry, user):
+            if only and case.name not in only:
+                continue
+            results.append(self.measure(case, user, options["requests"]))
+        return results
+
+    def cases(self, entry, user):
+        def fixed(name, *args):
+            url = reverse(name, args=args)
+            return lambda i: (url, None)
+
+        def own_entry(i):
+            return BlogEntry.objects.create(
+                title=f"Bench target {i}", content="body", author=user
+            )
+
+        targets = {}
+
+        def prepare_targets(requests):
+            targets["entries"] = [own_entry(i) for i in range(requests + 1)]
+
+        def target(i):
+            return reverse("entry-by-id", args=[targets["entries"][i].pk])
+
+        refresh_tokens = {}
+
+        def prepare_refresh(requests):
+            refresh_tokens["tokens"] = [
+                str(RefreshToken.for_user(user)) for _ in range(requests + 1)
+            ]
+
+        batch_ids = list(
+            BlogEntry.objects.filter(status="PUBLIC")
+            .order_by("-created_at")
+            .values_list("pk", flat=True)[:20]
+        )
+        refresh = str(RefreshToken.for_user(user))
+        comment = entry.comments.order_by("comment_number").first()
+        record = json.dumps({"title": "Imported", "content": "body"})
+
+        return [
+            Case("entry-list", "get", fixed("entry-list")),
+            Case("entry-list (auth)", "get", fixed("entry-list"), auth=True),
+            Case("entry-by-id", "get", fixed("entry-by-id", entry.pk)),
+            Case("entry-by-slug", "get", fixed("entry-by-slug", entry.slug)),
+            Case(
+                "entry-by-short-url",
+                "get",
+                fixed("entry-by-short-url", entry.short_url_id),
+            ),
+            Case(
+                "entry-search",
+                "get",
+                lambda i: (reverse("entry-search"), {"q": entry.title.split()[0]}),
+            ),
+            Case("entry-export", "get", fixed("entry-export"), auth=True),
+            Case(
+                "entry-import",
+                "post",
+                lambda i: (reverse("entry-import"), record),
+                auth=True,
+            ),
+            Case(
+                "entry-create",
+                "post",
+                lambda i: (
+                    reverse("entry-list"),
+                    {
+                        "title": f"Bench {i}",
+                        "content": "body",
+                        "status": "PUBLIC",
+                        "tags": ["bench"],
+                    },
+                ),
+                auth=True,
+            ),
+            Case(
+                "entry-update",
+                "patch",
+                lambda i: (target(i), {"content": f"edit {i}"}),
+                auth=True,
+                prepare=prepare_targets,
+            ),
+            Case(
+                "entry-delete",
+                "delete",
+                lambda i: (target(i), None),
+                auth=True,
+                prepare=prepare_targets,
+            ),
+            Case("feed-rss", "get", fixed("feed-rss")),
+            Case("feed-atom", "get", fixed("feed-atom")),
+            Case(
+                "author-feed-rss", "get", fixed("author-feed-rss", entry.author.username)
+            ),
+            Case(
+                "tag-feed-atom",
+                "get",
+                fixed("tag-feed-atom", entry.tags.values_list("slug", flat=True)[0]),
+            ),
+            Case(
+                "comments-by-entry-id",
+                "get",
+                fixed("comments-by-entry-id", entry.pk),
+            ),
+            Case(
+                "comments-by-entry-slug",
+                "get",
+                fixed("comments-by-entry-slug", entry.slug),
+            ),
+            Case(
+                "comments-by-entry-short",
+                "get",
+                fixed("comments-by-entry-short", entry.short_url_id),
+            ),
+            Case(
+                "comments-batch",
+                "get",
+                lambda i: (
+                    reverse("comments-batch"),
+                    {"id": ",".join(map(str, batch_ids)), "limit": 3},
+                ),
+            ),
+            Case(
+                "comment-detail-by-entry-id",
+                "get",
+                fixed("comment-detail-by-entry-id", entry.pk, comment.comment_number),
+            ),
+            Case(
+                "comment-detail-by-entry-slug",
+                "get",
+                fixed(
+                    "comment-detail-by-entry-slug", entry.slug, comment.comment_number
+                ),
+            ),
+            Case(
+                "comment-detail-by-entry-short",
+                "get",
+                fixed(
+                    "comment-detail-by-entry-short",
+                    entry.short_url_id,
+                    comment.comment_number,
+                ),
+            ),
+            Case(
+                "comment-create",
+                "post",
+                lambda i: (
+                    reverse("comments-by-entry-id", args=[entry.pk]),
+                    {"content": f"Comment {i}"},
+                ),
+                auth=True,
+            ),
+            Case(
+                "jwt-register",
+                "post",
+                lambda i: (
+                    reverse("jwt-register"),
+                    {
+                        "username": f"bench-register-{i}",
+                        "email": f"bench-register-{i}@example.com",
+                        "password": "Bench-register-1",
+                        "password2": "Bench-register-1",
+                    },
+                ),
+            ),
+            Case(
+                "jwt-obtain",
+                "post",
+                lambda i: (
+                    reverse("jwt-obtain"),
+                    {"email": user.email, "password": PASSWORD},
+                ),
+            ),
+            Case(
+                "jwt-refresh",
+                "post",
+                lambda i: (reverse("jwt-refresh"), {"refresh": refresh}),
+            ),
+            Case(
+                "jwt-verify",
+                "post",
+                lambda i: (reverse("jwt-verify"), {"token": refresh}),
+            ),
+            Case(
+                "jwt-revoke",
+                "post",
+                lambda i: (
+                    reverse("jwt-revoke"),
+                    {"refresh": refresh_tokens["tokens"][i]},
+                ),
+                prepare=prepare_refresh,
+            ),
+            Case("profile", "get", fixed("profile"), auth=True),
+        ]
+
+    def measure(self, case, user, requests):
+        client = Client(HTTP_HOST="localhost", HTTP_ACCEPT="application/json")
+        if case.auth:
+            client.defaults["HTTP_AUTHORIZATION"] = (
+                f"Bearer {AccessToken.for_user(user)}"
+            )
+        if case.prepare is not None:
+            case.prepare(requests)
+
+        counter = itertools.count()
+        queries = 0
+
+        def count_query(execute, *args):
+            nonlocal queries
+            queries += 1
+            return execute(*args)
+
+        def send(i):
+            url, data = case.request(i)
+            method = getattr(client, case.method)
+            if case.method == "get":
+                return method(url, data)
+            if case.name == "entry-import":
+                return method(url, data, content_type="application/x-ndjson")
+            return method(url, data, content_type="application/json")
+
+        samples = []
+        # Throttles would turn repeated writes into 429s
+        with override_settings(DEBUG=False, THROTTLE_ROUTES={}):
+            response = send(next(counter))  # warm up
+            if response.status_code >= 400:
+                raise CommandError(
+                    f"{case.name}: {response.status_code} {response.content[:200]!r}"
+                )
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count_query))
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = send(next(counter))
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    samples.append((time.perf_counter() - started) * 1000)
+
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        return {
+            "case": case.name,
+            "requests": requests,
+            "p50_ms": cuts[49],
+            "p95_ms": cuts[94],
+            "p99_ms": cuts[98],
+            "max_ms": max(samples),
+            "queries": queries / requests,
+        }
@@ -0,0 +1,81 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog.bulk import import_entries
+from blog.models import BlogEntry
+from core.benchmarks import rolled_back
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare entry/comment list latency with BLOG_FAST_READS on and off, "
+        "and check both render the same bytes. Test data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=500)
+        parser.add_argument("--comments", type=int, default=100)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=100)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(options)
+
+    def seed(self, entries, comments):
+        author = User.objects.create_user(
+            email="bench-reads@example.com", password=None, username="bench-reads"
+        )
+        records = (
+            {
+                "title": f"Benchmark entry {i}",
+                "content": "Lorem ipsum dolor sit amet. " * 200,
+                "status": "PUBLIC",
+                "tags": ["bench", f"tag-{i % 10}"],
+                "comments": [{"content": "Nice post!"}] * (comments if i == 0 else 0),
+            }
+            for i in range(entries)
+        )
+        import_entries(
+            (json.dumps(record) for record in records), default_author=author
+        )
+        return BlogEntry.objects.filter(author=author).order_by("pk").first()
+
+    def run(self, options):
+        entry = self.seed(options["entries"], options["comments"])
+        client = Client(HTTP_HOST="localhost", HTTP_ACCEPT="application/json")
+        params = {"page_size": options["page_size"]}
+        urls = {
+            "entry-list": reverse("entry-list"),
+            "comments-by-entry-id": reverse("comments-by-entry-id", args=[entry.pk]),
+        }
+        for name, url in urls.items():
+            bodies = {}
+            timings = {}
+            for fast in (False, True):
+                with override_settings(BLOG_FAST_READS=fast, DEBUG=False):
+                    client.get(url, params)  # warm up
+                    samples = []
+                    for _ in range(options["requests"]):
+                        started = time.perf_counter()
+                        response = client.get(url, params)
+                        samples.append((time.perf_counter() - started) * 1000)
+                    bodies[fast] = response.content
+                    timings[fast] = samples
+            slow_p50 = statistics.median(timings[False])
+            fast_p50 = statistics.median(timings[True])
+            self.stdout.write(
+                f"{name:<22} serializer p50 {slow_p50:7.2f} ms   "
+                f"fast p50 {fast_p50:7.2f} ms   "
+                f"speedup {slow_p50 / fast_p50:4.2f}x   "
+                f"identical={bodies[False] == bodies[True]}"
+            )
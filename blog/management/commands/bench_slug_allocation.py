@@ -0,0 +1,57 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blog.models import BlogEntry
+from core.benchmarks import rolled_back
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create many entries sharing one title and report slug allocation "
+        "cost. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=2000)
+        parser.add_argument("--title", default="Hello World")
+        parser.add_argument(
+            "--report-every", type=int, default=500, help="Print progress every N saves."
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        with rolled_back():
+            author = User.objects.create_user(
+                email="bench-slug@example.com", password=None, username="bench-slug"
+            )
+            self.run(author, count, options["title"], options["report_every"])
+
+    def run(self, author, count, title, report_every):
+        total_queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal total_queries
+            total_queries += 1
+            return execute(sql, params, many, context)
+
+        started = window_started = time.perf_counter()
+        for i in range(1, count + 1):
+            with connection.execute_wrapper(count_queries):
+                BlogEntry.objects.create(title=title, content="", author=author)
+            if i % report_every == 0:
+                now = time.perf_counter()
+                self.stdout.write(
+                    f"{i:>7} saves  {(now - window_started) / report_every * 1000:.3f} ms/save"
+                )
+                window_started = now
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{count} entries titled {title!r}: {elapsed:.2f}s total, "
+            f"{elapsed / count * 1000:.3f} ms/save, "
+            f"{total_queries / count:.2f} queries/save"
+        )
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from blog.export import CHUNK_SIZE, export_lines, export_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Write entries, tags and comments as NDJSON, readable by "
+        "import_entries. Memory use stays flat regardless of table size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default="-", help='Output file, or "-" for stdout.'
+        )
+        parser.add_argument("--author", help="Only entries by this username.")
+        parser.add_argument("--status", help="Only entries with this status.")
+        parser.add_argument(
+            "--since",
+            help="Only entries or comments updated at or after this ISO datetime.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                raise CommandError("--since must be an ISO 8601 datetime.")
+        queryset = export_queryset(
+            author=options["author"], status=options["status"], since=since
+        )
+        lines = export_lines(queryset, chunk_size=options["chunk_size"])
+
+        if options["output"] == "-":
+            sys.stdout.writelines(lines)
+        else:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                output.writelines(lines)
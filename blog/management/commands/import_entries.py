@@ -0,0 +1,55 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.bulk import DEFAULT_BATCH_SIZE, import_entries
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import entries, tags and comments from an NDJSON file (one entry per "
+        "line, see blog.bulk). Invalid lines are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='NDJSON file, or "-" for stdin.')
+        parser.add_argument(
+            "--author",
+            help="Username used for records and comments without an author.",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        default_author = None
+        if options["author"]:
+            try:
+                default_author = User.objects.get(username=options["author"])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user {options['author']!r}.")
+
+        if options["path"] == "-":
+            result = self.run(sys.stdin, default_author, options["batch_size"])
+        else:
+            with open(options["path"], encoding="utf-8") as lines:
+                result = self.run(lines, default_author, options["batch_size"])
+
+        for error in result["errors"]:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result['entries']} entries and {result['comments']} "
+                f"comments, {len(result['errors'])} lines rejected."
+            )
+        )
+
+    def run(self, lines, default_author, batch_size):
+        return import_entries(
+            lines,
+            default_author=default_author,
+            allow_other_authors=True,
+            batch_size=batch_size,
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import BlogEntry
+from blog.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Recompute BlogEntry.search_vector for every entry (PostgreSQL only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pks = list(BlogEntry.objects.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(pks), batch_size):
+            update_search_vectors(
+                BlogEntry.objects.filter(pk__in=pks[start : start + batch_size])
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(pks)} search vectors."))
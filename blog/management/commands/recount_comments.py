@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from blog.models import BlogEntry, Comment
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute BlogEntry.comment_count and next_comment_number from the "
+        "comment table, e.g. after importing rows with raw SQL."
+    )
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.filter(blog_entry=OuterRef("pk")).values(
+            "blog_entry"
+        )
+        updated = BlogEntry.objects.update(
+            comment_count=Coalesce(
+                Subquery(comments.annotate(n=Count("pk")).values("n")), Value(0)
+            ),
+            next_comment_number=Coalesce(
+                Subquery(comments.annotate(n=Max("comment_number")).values("n")),
+                Value(0),
+            )
+            + 1,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Recounted {updated} entries."))
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog import cache as entry_cache
+from blog import rendering
+from blog.feeds import invalidate_all_feeds
+from blog.models import BlogEntry, Comment
+from core.cache import is_shared
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-render content_html for entries and comments rendered by an "
+        "older blog.rendering version (all rows with --all)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--all", action="store_true", help="Re-render every row."
+        )
+
+    def handle(self, *args, **options):
+        entries = self.rerender(BlogEntry, options, invalidate=True)
+        comments = self.rerender(Comment, options, invalidate=False)
+        if entries:
+            invalidate_all_feeds()
+        if entries and not is_shared():
+            self.stderr.write(self.style.WARNING(entry_cache.PER_PROCESS_WARNING))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-rendered {entries} entries and {comments} comments "
+                f"(renderer version {rendering.RENDERER_VERSION})."
+            )
+        )
+
+    def rerender(self, model, options, invalidate):
+        queryset = model.objects.order_by("pk").only("pk", "content")
+        if not options["all"]:
+            queryset = queryset.exclude(
+                content_html_version=rendering.RENDERER_VERSION
+            )
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[: options["batch_size"]])
+            if not batch:
+                break
+            now = timezone.now()
+            for obj in batch:
+                obj.render_content()
+                # bulk_update skips auto_now; ETags and exports key on it
+                obj.updated_at = now
+            with transaction.atomic():
+                model.objects.bulk_update(
+                    batch, ["content_html", "content_html_version", "updated_at"]
+                )
+            if invalidate:
+                for obj in batch:
+                    entry_cache.invalidate_entry(obj.pk)
+            updated += len(batch)
+            last_pk = batch[-1].pk
+        return updated
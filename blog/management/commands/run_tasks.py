@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog import tasks
+from blog.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background tasks (search vector refreshes and the like). "
+        "Use --loop for a dedicated worker when BLOG_TASKS_MODE is \"off\"."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling for new tasks."
+        )
+        parser.add_argument(
+            "--interval", type=float, default=1.0, help="Seconds between polls."
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Queue failed tasks again before running.",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            retried = 0
+            for failed in Task.objects.filter(status=Task.FAILED):
+                if not Task.objects.filter(
+                    key=failed.key, status=Task.PENDING
+                ).exists():
+                    failed.status = Task.PENDING
+                    failed.attempts = 0
+                    failed.save(update_fields=["status", "attempts", "updated_at"])
+                    retried += 1
+                else:
+                    failed.delete()
+            self.stdout.write(f"Re-queued {retried} failed tasks.")
+
+        ran = tasks.drain()
+        while options["loop"]:
+            time.sleep(options["interval"])
+            close_old_connections()
+            ran += tasks.drain()
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} tasks."))
@@ -0,0 +1,104 @@
+import json
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.bulk import DEFAULT_BATCH_SIZE, import_entries
+
+User = get_user_model()
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua django postgres "
+    "python cache index query latency async benchmark"
+).split()
+
+STATUSES = ["PUBLIC"] * 8 + ["UNLISTED", "PRIVATE"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users, tagged entries and comments for local benchmarking. "
+        "Users share one password (hashed once) and rows are inserted "
+        "through the bulk importer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--entries", type=int, default=1000)
+        parser.add_argument("--comments", type=int, default=5, help="Per entry.")
+        parser.add_argument("--tags", type=int, default=30, help="Distinct tags.")
+        parser.add_argument("--tags-per-entry", type=int, default=3)
+        parser.add_argument("--paragraphs", type=int, default=5)
+        parser.add_argument("--password", default="password")
+        parser.add_argument("--prefix", default="seed")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        usernames = self.create_users(options)
+        result = import_entries(
+            (json.dumps(record) for record in self.records(rng, usernames, options)),
+            allow_other_authors=True,
+            batch_size=options["batch_size"],
+        )
+        for error in result["errors"]:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(usernames)} users, {result['entries']} entries and "
+                f"{result['comments']} comments."
+            )
+        )
+
+    def create_users(self, options):
+        prefix = options["prefix"]
+        usernames = [f"{prefix}-user-{i}" for i in range(options["users"])]
+        existing = set(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", flat=True
+            )
+        )
+        password = make_password(options["password"])
+        User.objects.bulk_create(
+            [
+                User(username=name, email=f"{name}@example.com", password=password)
+                for name in usernames
+                if name not in existing
+            ],
+            batch_size=options["batch_size"],
+        )
+        return usernames
+
+    def text(self, rng, words):
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    def records(self, rng, usernames, options):
+        prefix = options["prefix"]
+        tags = [f"{prefix}-tag-{i}" for i in range(options["tags"])]
+        now = timezone.now()
+        for i in range(options["entries"]):
+            created_at = now - timedelta(minutes=options["entries"] - i)
+            yield {
+                "title": f"{self.text(rng, 4).capitalize()} {i}",
+                "content": "\n\n".join(
+                    self.text(rng, 60) for _ in range(options["paragraphs"])
+                ),
+                "status": rng.choice(STATUSES),
+                "author": rng.choice(usernames),
+                "created_at": created_at.isoformat(),
+                "tags": rng.sample(tags, min(options["tags_per_entry"], len(tags))),
+                "comments": [
+                    {
+                        "author": rng.choice(usernames),
+                        "content": self.text(rng, 20),
+                        "created_at": (created_at + timedelta(seconds=j)).isoformat(),
+                    }
+                    for j in range(options["comments"])
+                ],
+            }
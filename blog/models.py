@@ -1,14 +1,140 @@
-from django.db import models
+import itertools
+import re
+
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.functions import Coalesce, Greatest, Length
 from django.contrib.auth import get_user_model
-from django.utils.text import slugify
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
-import hashlib
+from django.utils.text import Truncator, slugify
 from taggit.managers import TaggableManager
 
+from . import rendering
+from .short_ids import get_short_id_generator
+
 User = get_user_model()
 
+EXCERPT_LENGTH = 280
+
+# How many times save() re-allocates a generated slug after losing a race
+SLUG_ALLOCATION_ATTEMPTS = 5
+
+# "-N" slugs _free_slugs() reads per query looking for a title's own
+SLUG_SCAN_BATCH = 10
+
+# Room a long title's slug leaves for a "-N" suffix
+SLUG_SUFFIX_LENGTH = len("-9999999999")
+
+
+def visible_entry_q(user, prefix=""):
+    """
+    Q matching entries ``user`` may read, for a query on BlogEntry or,
+    with ``prefix`` (e.g. "blog_entry__"), on a model related to it.
+    """
+    public = models.Q(**{f"{prefix}status": "PUBLIC"})
+    if user is None or not user.is_authenticated:
+        return public
+    return public | models.Q(**{f"{prefix}author_id": user.pk})
+
+
+class BlogEntryQuerySet(models.QuerySet):
+    # visible_to()'s two disjoint branches, merged by __getitem__
+    _visible_branches = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._visible_branches = self._visible_branches
+        return clone
+
+    def visible_to(self, user):
+        """
+        Entries ``user`` may read: PUBLIC ones plus their own.
+
+        For filters, counts and lookups this is an OR of two predicates,
+        each matching one of the (status, created_at) and (author,
+        created_at) indexes. An ordered page of it (a slice, as cursor
+        pagination takes) is instead a UNION ALL of the two branches, each
+        ordered and limited on its own index, so PostgreSQL reads at most
+        a page from each rather than a BitmapOr of every match plus a sort.
+        """
+        queryset = self.filter(visible_entry_q(user))
+        if user is not None and user.is_authenticated:
+            public = models.Q(status="PUBLIC")
+            queryset._visible_branches = (
+                public,
+                models.Q(author_id=user.pk) & ~public,
+            )
+        return queryset
+
+    def __getitem__(self, k):
+        ordering = self._mergeable_ordering(k)
+        if ordering is None:
+            return super().__getitem__(k)
+        branches = []
+        for q in self._visible_branches:
+            branch = self.filter(q)
+            branch._visible_branches = None
+            branches.append(branch.order_by(*ordering)[: k.stop])
+        merged = branches[0].union(*branches[1:], all=True)
+        return merged.order_by(*ordering)[k]
 
-class BlogEntry(models.Model):
+    def _mergeable_ordering(self, k):
+        """
+        The ordering to merge visible_to()'s branches on when taking slice
+        ``k``, or None to run the OR query as is.
+        """
+        if (
+            self._visible_branches is None
+            or self._result_cache is not None
+            or not isinstance(k, slice)
+            or k.stop is None
+            or k.step is not None
+            or self.query.is_sliced
+            or self.query.combinator
+            or self.query.distinct
+            or self.query.extra_order_by
+            or not connections[self.db].features.supports_slicing_ordering_in_compound
+        ):
+            return None
+        ordering = self.query.order_by or (
+            self.model._meta.ordering if self.query.default_ordering else ()
+        )
+        columns = {
+            field.name
+            for field in self.model._meta.concrete_fields
+            if not field.is_relation
+        }
+        if not ordering or not all(
+            isinstance(term, str) and term.lstrip("-") in columns for term in ordering
+        ):
+            return None
+        return ordering
+
+
+class RenderedContentMixin:
+    """
+    Keeps content_html / content_html_version in step with content.
+    """
+
+    def render_content(self):
+        self.content_html = rendering.render(self.content)
+        self.content_html_version = rendering.RENDERER_VERSION
+
+    def render_content_for_save(self, save_kwargs):
+        # Only when content is being written; an explicit update_fields
+        # then gets the rendered fields too.
+        update_fields = save_kwargs.get("update_fields")
+        if update_fields is None or "content" in update_fields:
+            self.render_content()
+            if update_fields is not None:
+                save_kwargs["update_fields"] = {
+                    *update_fields,
+                    "content_html",
+                    "content_html_version",
+                }
+
+
+class BlogEntry(RenderedContentMixin, models.Model):
     STATUS_CHOICES = (
         ("PUBLIC", "Public"),
         ("UNLISTED", "Unlisted"),
@@ -19,48 +145,242 @@ class BlogEntry(models.Model):
     slug = models.SlugField(max_length=200, unique=True, blank=True)
     short_url_id = models.CharField(max_length=10, unique=True, blank=True)
     content = models.TextField()
+    # Plain-text prefix of content for list views, refreshed on save
+    excerpt = models.CharField(max_length=300, blank=True, editable=False)
+    # content rendered by blog.rendering on save, see RenderedContentMixin
+    content_html = models.TextField(blank=True, editable=False)
+    content_html_version = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Indexed by blog_entry_author_created instead of a separate FK index
     author = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name="blog_entries"
+        User, on_delete=models.CASCADE, related_name="blog_entries", db_index=False
     )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PRIVATE")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager(blank=True)
+    # Maintained by Comment.save and the comment post_delete signal
+    next_comment_number = models.PositiveIntegerField(default=1, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Maintained after save on PostgreSQL, see blog.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    MAINTAINED_FIELDS = ("next_comment_number", "comment_count", "search_vector")
+
+    objects = BlogEntryQuerySet.as_manager()
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # Back visible_to() and the ("-created_at", "-id") ordering
+            models.Index(
+                fields=["status", "created_at", "id"], name="blog_entry_status_created"
+            ),
+            models.Index(
+                fields=["author", "created_at", "id"], name="blog_entry_author_created"
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        entry = super().from_db(db, field_names, values)
+        # As loaded, so blog.feeds can refresh the feeds an entry just left
+        entry._loaded_status = entry.__dict__.get("status")
+        entry._loaded_author_id = entry.__dict__.get("author_id")
+        return entry
+
+    @staticmethod
+    def make_excerpt(content):
+        return Truncator(" ".join(content.split())).chars(EXCERPT_LENGTH)
+
+    @classmethod
+    def _slug_bases(cls, title):
+        """
+        Return the bare slug for a title and the stem its "-N" slugs are
+        built on, both cut to fit the slug column. Long titles get a stem
+        short enough for any suffix, so every numbered slug shares it.
+        """
+        max_length = cls._meta.get_field("slug").max_length
+        base = slugify(title)[:max_length].rstrip("-_")
+        if len(base) + SLUG_SUFFIX_LENGTH <= max_length:
+            return base, base
+        return base, base[: max_length - SLUG_SUFFIX_LENGTH].rstrip("-_")
+
+    @classmethod
+    def base_slug(cls, title):
+        """
+        The slug ``title`` gets when it is free. Titles sharing one share
+        its "-N" sequence.
+        """
+        return cls._slug_bases(title)[0]
+
+    @classmethod
+    def _free_slugs(cls, title):
+        """
+        Yield free slugs for a title in allocation order: "title" if it is
+        free, then "title-N" from one past the highest suffix held by an
+        entry with the same base slug. Suffixes other titles hold, such as
+        hello-world-2024 for "Hello World 2024", are skipped rather than
+        continued from.
+
+        The query returns the bare slug (if taken) followed by "title-N"
+        slugs longest, and therefore numerically largest, first, so the
+        first batch normally reaches this title's own highest suffix.
+        """
+        base, stem = cls._slug_bases(title)
+        candidates = (
+            cls.objects.filter(
+                models.Q(slug=base)
+                | models.Q(
+                    slug__startswith=f"{stem}-",
+                    slug__regex=rf"^{re.escape(stem)}-[0-9]+$",
+                )
+            )
+            .order_by(
+                models.Case(
+                    models.When(slug=base, then=models.Value(0)),
+                    default=models.Value(1),
+                ),
+                Length("slug").desc(),
+                "-slug",
+            )
+            .values_list("slug", "title")
+        )
+
+        def taken():
+            for offset in itertools.count(0, SLUG_SCAN_BATCH):
+                batch = list(candidates[offset : offset + SLUG_SCAN_BATCH])
+                yield from batch
+                if len(batch) < SLUG_SCAN_BATCH:
+                    return
+
+        base_taken, highest, held = False, 0, set()
+        for slug, slug_title in taken():
+            if slug == base:
+                base_taken = True
+                continue
+            suffix = int(slug.rsplit("-", 1)[1])
+            if cls.base_slug(slug_title) == base:
+                highest = suffix
+                break
+            held.add(suffix)
+
+        if not base_taken:
+            yield base
+        for n in itertools.count(highest + 1):
+            if n not in held:
+                yield f"{stem}-{n}"
+
+    @classmethod
+    def allocate_slug(cls, title):
+        """
+        Return the next free slug for a title, see _free_slugs().
+        """
+        return next(cls._free_slugs(title))
+
+    @classmethod
+    def allocate_slugs(cls, title, count):
+        """
+        Return ``count`` free slugs for a title, for bulk inserts.
+        """
+        return list(itertools.islice(cls._free_slugs(title), count))
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
-            # Ensure slug is unique
-            original_slug = self.slug
-            counter = 1
-            while BlogEntry.objects.filter(slug=self.slug).exists():
-                self.slug = f"{original_slug}-{counter}"
-                counter += 1
+        # Never write back counters or the search vector read earlier; they
+        # may have been updated since this instance was loaded.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+            ]
+
+        self.excerpt = self.make_excerpt(self.content)
+        self.render_content_for_save(kwargs)
+        generate_slug = not self.slug
         if not self.short_url_id:
-            # Generate a unique short ID (e.g., first 8 chars of a hash)
-            hash_input = f"{self.title}-{timezone.now()}-{self.author.id}"
-            self.short_url_id = hashlib.sha256(hash_input.encode()).hexdigest()[:8]
-            # Ensure short_url_id is unique
-            original_short_url_id = self.short_url_id
-            counter = 1
-            while BlogEntry.objects.filter(short_url_id=self.short_url_id).exists():
-                self.short_url_id = f"{original_short_url_id}-{counter}"
-                counter += 1
-        super().save(*args, **kwargs)
+            self.short_url_id = get_short_id_generator().generate()
+        if not generate_slug:
+            super().save(*args, **kwargs)
+            return
+
+        # A concurrent save may claim the same slug between allocation and
+        # insert; the unique constraint catches it and we allocate again.
+        for attempt in range(SLUG_ALLOCATION_ATTEMPTS):
+            self.slug = self.allocate_slug(self.title)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if attempt == SLUG_ALLOCATION_ATTEMPTS - 1:
+                    raise
 
     def __str__(self):
         return self.title
 
 
-class Comment(models.Model):
+class ShortIdCounter(models.Model):
+    """
+    Monotonic counter backing BlockCounterShortIdGenerator.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class Task(models.Model):
+    """
+    A queued background task, run by blog.tasks. At most one task per key
+    is pending at a time, so repeated saves of an entry collapse into one
+    run.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=200)
+    args = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status="pending"),
+                name="blog_task_pending_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="blog_task_due"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status})"
+
+
+class Comment(RenderedContentMixin, models.Model):
     blog_entry = models.ForeignKey(
         BlogEntry, on_delete=models.CASCADE, related_name="comments"
     )
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
     content = models.TextField()
+    content_html = models.TextField(blank=True, editable=False)
+    content_html_version = models.PositiveSmallIntegerField(default=0, editable=False)
     comment_number = models.PositiveIntegerField(editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -73,13 +393,35 @@ class Comment(models.Model):
         ]  # Ensure uniqueness per blog entry
 
     def save(self, *args, **kwargs):
-        if not self.comment_number:
-            # Get the maximum comment number for this blog entry
-            max_number = Comment.objects.filter(blog_entry=self.blog_entry).aggregate(
-                models.Max("comment_number")
-            )["comment_number__max"]
-            self.comment_number = (max_number or 0) + 1
-        super().save(*args, **kwargs)
+        self.render_content_for_save(kwargs)
+        if self.comment_number:
+            super().save(*args, **kwargs)
+            return
+
+        # Bumping the entry's counter locks its row until commit, so
+        # concurrent comments on the same entry get consecutive numbers.
+        # Entries from before the counters existed (until recount_comments
+        # runs) still have the defaults, so never go below the highest
+        # number in use; that's one probe of the (entry, number) index.
+        highest = (
+            Comment.objects.filter(blog_entry=models.OuterRef("pk"))
+            .order_by("-comment_number")
+            .values("comment_number")[:1]
+        )
+        with transaction.atomic():
+            entries = BlogEntry.objects.filter(pk=self.blog_entry_id)
+            entries.update(
+                next_comment_number=Greatest(
+                    models.F("next_comment_number"),
+                    Coalesce(models.Subquery(highest), 0) + 1,
+                )
+                + 1,
+                comment_count=models.F("comment_count") + 1,
+            )
+            self.comment_number = (
+                entries.values_list("next_comment_number", flat=True).get() - 1
+            )
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Comment by {self.author} on {self.blog_entry.title}"
@@ -0,0 +1,149 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    CursorPagination whose cursor holds the whole ordering key.
+
+    DRF positions a cursor on the first ordering field alone and steps over
+    rows sharing it with an offset, so a page boundary inside a run of tied
+    timestamps costs an OFFSET scan (capped at offset_cutoff). Here the
+    position is every ordering field, which must together be unique, and
+    the next page starts strictly after it.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            values = self._decode_position(queryset.model, current_position)
+            queryset = queryset.filter(self._after(self.ordering, values, reverse))
+
+        # Positions are unique, so offsets only come from cursors DRF made
+        results = list(queryset[offset : offset + self.page_size + 1])
+        self.page = list(results[: self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _after(self, ordering, values, reverse):
+        """
+        Q for rows after ``values`` in ``ordering``. Each field gets a
+        non-strict bound ANDed in, (a <= x AND (a < x OR b < y)) rather than
+        (a < x OR (a = x AND b < y)), so the first one bounds an index scan.
+        """
+        term, *rest = ordering
+        field = term.lstrip("-")
+        lookup = "lt" if term.startswith("-") != reverse else "gt"
+        strictly = Q(**{f"{field}__{lookup}": values[0]})
+        if not rest:
+            return strictly
+        return Q(**{f"{field}__{lookup}e": values[0]}) & (
+            strictly | self._after(rest, values[1:], reverse)
+        )
+
+    def _decode_position(self, model, position):
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(term.lstrip("-")).to_python(value)
+                for term, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for term in ordering:
+            field_name = term.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(instance[field_name])
+            else:
+                values.append(getattr(instance, field_name))
+        return json.dumps([str(value) for value in values], separators=(",", ":"))
+
+
+class BlogEntryCursorPagination(KeysetCursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "BLOG_MAX_PAGE_SIZE", 100)
+
+
+class CommentCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the per-entry comment_number, oldest first.
+    """
+
+    ordering = ("comment_number",)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "BLOG_MAX_PAGE_SIZE", 100)
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Search results are ordered by rank, which has no stable keyset, so
+    they are paged by number instead.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "BLOG_MAX_PAGE_SIZE", 100)
@@ -1,6 +1,19 @@
 from rest_framework import permissions
 
 
+def get_blog_entry(view, comment):
+    """
+    The comment's entry, reusing the one the view already resolved for this
+    request when it is the same row.
+    """
+    get_entry = getattr(view, "get_blog_entry", None)
+    if get_entry is not None:
+        entry = get_entry()
+        if entry.pk == comment.blog_entry_id:
+            return entry
+    return comment.blog_entry
+
+
 class IsAuthorOrReadOnly(permissions.BasePermission):
     """
     Custom permission to only allow owners of an object to edit it.
@@ -13,7 +26,7 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner of the snippet.
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
 
 
 class IsAdminOrAuthorOrReadOnly(permissions.BasePermission):
@@ -31,7 +44,7 @@ class IsAdminOrAuthorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        return request.user.is_staff or obj.author == request.user
+        return request.user.is_staff or obj.author_id == request.user.pk
 
 
 class IsAuthorOrAdmin(permissions.BasePermission):
@@ -40,7 +53,7 @@ class IsAuthorOrAdmin(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or obj.author == request.user
+        return request.user.is_staff or obj.author_id == request.user.pk
 
 
 class BlogEntryPermission(permissions.BasePermission):
@@ -59,7 +72,7 @@ class BlogEntryPermission(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Authors can do anything with their own entries
-        if obj.author == request.user:
+        if obj.author_id == request.user.pk:
             return True
 
         # Public entries are readable by anyone
@@ -93,12 +106,12 @@ class CommentPermission(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Authors can do anything with their own comments
-        if obj.author == request.user:
+        if obj.author_id == request.user.pk:
             return True
 
         # Read permissions are allowed to any request for comments on public/unlisted entries
         if request.method in permissions.SAFE_METHODS:
-            if obj.blog_entry.status in ["PUBLIC", "UNLISTED"]:
+            if get_blog_entry(view, obj).status in ["PUBLIC", "UNLISTED"]:
                 return True
 
         return False
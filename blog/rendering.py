@@ -0,0 +1,52 @@
+"""
+Markdown to sanitized HTML for entry and comment content.
+
+Content is rendered once on save and stored with the RENDERER_VERSION that
+produced it; bump the version whenever the output of render() changes and
+run ``manage.py rerender_content`` to refresh stored HTML.
+
+Rendering uses Markdown and nh3 when they are installed. Without them the
+text is escaped and split into paragraphs, stored as version 0 so the
+command re-renders it once the libraries are available.
+"""
+
+from django.utils.html import linebreaks
+
+try:
+    import markdown
+    import nh3
+except ImportError:  # pragma: no cover
+    markdown = nh3 = None
+
+RENDERER_VERSION = 1 if markdown is not None else 0
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "sane_lists"]
+
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "code", "del", "em", "h1", "h2",
+    "h3", "h4", "h5", "h6", "hr", "i", "img", "li", "ol", "p", "pre", "strong",
+    "table", "tbody", "td", "th", "thead", "tr", "ul",
+}  # fmt: skip
+
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "abbr": {"title"},
+    "img": {"src", "alt", "title"},
+    "th": {"align"},
+    "td": {"align"},
+}
+
+URL_SCHEMES = {"http", "https", "mailto"}
+
+
+def render(text):
+    if markdown is None:
+        return linebreaks(text, autoescape=True)
+    html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+    return nh3.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        url_schemes=URL_SCHEMES,
+        link_rel="nofollow noopener",
+    )
@@ -0,0 +1,109 @@
+"""
+Full-text search over blog entries.
+
+On PostgreSQL, ``BlogEntry.search_vector`` holds a weighted tsvector of
+the title, tags and content. It is refreshed by a background task
+(blog.tasks) queued on every save and tag change, and served by a GIN
+index. Other databases fall back to case-insensitive LIKE matching with a
+simple weighted score, which keeps the endpoint testable on SQLite.
+"""
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Case, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from taggit.models import TaggedItem
+
+SEARCH_CONFIG = getattr(settings, "BLOG_SEARCH_CONFIG", "english")
+SEARCH_INDEX_NAME = "blog_blogentry_search_gin"
+
+# LIKE fallback weights, mirroring the tsvector weights A/B/C
+TITLE_WEIGHT, TAG_WEIGHT, CONTENT_WEIGHT = 3, 2, 1
+
+
+def is_postgres(using):
+    return connections[using].vendor == "postgresql"
+
+
+def update_search_vectors(queryset):
+    """
+    Recompute the search vector of every entry in ``queryset`` with one
+    UPDATE.
+    """
+    if not is_postgres(queryset.db):
+        return
+    tags = Subquery(
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(queryset.model),
+            object_id=OuterRef("pk"),
+        )
+        .values("object_id")
+        .annotate(names=StringAgg("tag__name", " "))
+        .values("names")
+    )
+    queryset.update(
+        search_vector=(
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector(Coalesce(tags, Value("")), weight="B", config=SEARCH_CONFIG)
+            + SearchVector("content", weight="C", config=SEARCH_CONFIG)
+        )
+    )
+
+
+def search_entries(queryset, query):
+    """
+    Filter ``queryset`` down to entries matching ``query``, best match first.
+    """
+    if is_postgres(queryset.db):
+        search_query = SearchQuery(query, search_type="websearch", config=SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-created_at", "-id")
+        )
+
+    terms = query.split()
+    if not terms:
+        return queryset.none()
+
+    rank = Value(0)
+    for term in terms:
+        tagged = Exists(
+            TaggedItem.objects.filter(
+                content_type__model=queryset.model._meta.model_name,
+                content_type__app_label=queryset.model._meta.app_label,
+                object_id=OuterRef("pk"),
+                tag__name__icontains=term,
+            )
+        )
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(content__icontains=term) | tagged
+        )
+        rank = (
+            rank
+            + Case(When(title__icontains=term, then=Value(TITLE_WEIGHT)), default=0)
+            + Case(When(tagged, then=Value(TAG_WEIGHT)), default=0)
+            + Case(When(content__icontains=term, then=Value(CONTENT_WEIGHT)), default=0)
+        )
+    return queryset.annotate(rank=rank).order_by("-rank", "-created_at", "-id")
+
+
+def create_search_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate hook creating the GIN index on PostgreSQL. The index can't
+    live in Meta.indexes because other backends reject "USING gin".
+    """
+    if not is_postgres(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} "
+            "ON blog_blogentry USING gin (search_vector)"
+        )
@@ -3,10 +3,46 @@ from taggit.serializers import TagListSerializerField
 from .models import BlogEntry, Comment
 from django.contrib.auth import get_user_model
 
+from core.metrics import TimedSerializerMixin
+
 User = get_user_model()
 
 
-class BlogEntrySerializer(serializers.ModelSerializer):
+def parse_sparse_fieldset(query_params):
+    """
+    Return (fields, omit) from comma-separated ?fields= and ?omit= values.
+    ``fields`` is None when every field is selected.
+    """
+
+    def names(param):
+        return {name for name in query_params.get(param, "").split(",") if name}
+
+    return names("fields") or None, names("omit")
+
+
+def is_selected(name, fieldset):
+    fields, omit = fieldset
+    return (fields is None or name in fields) and name not in omit
+
+
+class SparseFieldsetMixin:
+    """
+    Drop fields not selected by the "sparse_fieldset" context entry, a
+    (fields, omit) pair from parse_sparse_fieldset.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get("sparse_fieldset")
+        if fieldset is not None:
+            for name in list(self.fields):
+                if not is_selected(name, fieldset):
+                    self.fields.pop(name)
+
+
+class BlogEntrySerializer(
+    TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
     author = serializers.ReadOnlyField(source="author.username")
     tags = TagListSerializerField()
 
@@ -18,16 +54,47 @@ class BlogEntrySerializer(serializers.ModelSerializer):
             "slug",
             "short_url_id",
             "content",
+            "content_html",
+            "author",
+            "status",
+            "created_at",
+            "updated_at",
+            "tags",
+            "comment_count",
+        ]
+        read_only_fields = [
+            "slug",
+            "short_url_id",
+            "created_at",
+            "updated_at",
+            "comment_count",
+        ]
+
+
+class BlogEntryListSerializer(BlogEntrySerializer):
+    """
+    List representation: the stored excerpt instead of the full content.
+    """
+
+    class Meta(BlogEntrySerializer.Meta):
+        fields = [
+            "id",
+            "title",
+            "slug",
+            "short_url_id",
+            "excerpt",
             "author",
             "status",
             "created_at",
             "updated_at",
             "tags",
+            "comment_count",
         ]
-        read_only_fields = ["slug", "short_url_id", "created_at", "updated_at"]
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(
+    TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
     author = serializers.ReadOnlyField(source="author.username")
 
     class Meta:
@@ -38,7 +105,33 @@ class CommentSerializer(serializers.ModelSerializer):
             "comment_number",
             "author",
             "content",
+            "content_html",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["blog_entry", "comment_number", "created_at", "updated_at"]
+
+
+class BulkCommentSerializer(serializers.Serializer):
+    author = serializers.CharField(required=False)
+    content = serializers.CharField()
+    created_at = serializers.DateTimeField(required=False)
+
+
+class BulkEntrySerializer(serializers.Serializer):
+    """
+    Validates one NDJSON record of a bulk import. Authors are usernames and
+    are resolved per batch by blog.bulk.
+    """
+
+    title = serializers.CharField(max_length=200)
+    content = serializers.CharField()
+    status = serializers.ChoiceField(
+        choices=BlogEntry.STATUS_CHOICES, default="PRIVATE"
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=100), default=list
+    )
+    author = serializers.CharField(required=False)
+    created_at = serializers.DateTimeField(required=False)
+    comments = BulkCommentSerializer(many=True, default=list)
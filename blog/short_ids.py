@@ -0,0 +1,132 @@
+"""
+Short URL id generation.
+
+Generators hand out integers from a counter that never repeats, so
+``BlogEntry.save`` never has to probe for a free id. The integers are
+permuted and base62-encoded into fixed-width ids that fit
+``BlogEntry.short_url_id``. The generator class is chosen with the
+``BLOG_SHORT_ID_GENERATOR`` setting.
+"""
+
+import functools
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# Seven characters never clash with the legacy ids, which are eight hex
+# characters with an optional "-N" suffix.
+WIDTH = 7
+SPACE = len(ALPHABET) ** WIDTH
+
+# An affine map modulo SPACE with a multiplier coprime to 62 is a bijection,
+# so consecutive counter values give distinct, non-consecutive ids.
+MULTIPLIER = 1745515086077
+OFFSET = 917526034219
+
+
+def encode_base62(number, width=WIDTH):
+    chars = []
+    for _ in range(width):
+        number, remainder = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+
+def counter_to_short_id(value):
+    return encode_base62((value * MULTIPLIER + OFFSET) % SPACE)
+
+
+class ShortIdGenerator:
+    """
+    Base class for short id generators.
+
+    Subclasses implement ``next_values`` to return ``count`` counter values
+    that have never been handed out before.
+    """
+
+    def next_values(self, count):
+        raise NotImplementedError
+
+    def generate(self):
+        return self.generate_many(1)[0]
+
+    def generate_many(self, count):
+        return [counter_to_short_id(value) for value in self.next_values(count)]
+
+
+class BlockCounterShortIdGenerator(ShortIdGenerator):
+    """
+    Reserve blocks of counter values from a ``ShortIdCounter`` row and hand
+    them out from memory, so most ids cost no query at all.
+
+    Inside an open transaction only the requested values are reserved:
+    a rollback would release the block in the database while this process
+    kept handing it out.
+    """
+
+    counter_name = "short_url_id"
+
+    def __init__(self):
+        self.block_size = getattr(settings, "BLOG_SHORT_ID_BLOCK_SIZE", 100)
+        self._lock = threading.Lock()
+        self._next = self._end = 0
+
+    def next_values(self, count):
+        with self._lock:
+            if connection.in_atomic_block:
+                start, _ = self._reserve(count)
+                return list(range(start, start + count))
+            if self._end - self._next < count:
+                self._next, self._end = self._reserve(max(count, self.block_size))
+            start = self._next
+            self._next += count
+            return list(range(start, start + count))
+
+    def _reserve(self, size):
+        from .models import ShortIdCounter
+
+        with transaction.atomic():
+            counter, _ = ShortIdCounter.objects.select_for_update().get_or_create(
+                name=self.counter_name
+            )
+            start = counter.value
+            counter.value = start + size
+            counter.save(update_fields=["value"])
+        return start, start + size
+
+
+class PostgresSequenceShortIdGenerator(ShortIdGenerator):
+    """
+    Draw counter values from a PostgreSQL sequence. Sequences ignore
+    rollbacks, so values are never handed out twice.
+    """
+
+    sequence_name = "blog_short_url_id_seq"
+
+    def __init__(self):
+        self._created = False
+
+    def next_values(self, count):
+        with connection.cursor() as cursor:
+            if not self._created:
+                cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {self.sequence_name}")
+                self._created = True
+            cursor.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                [self.sequence_name, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+@functools.cache
+def get_short_id_generator():
+    path = getattr(
+        settings,
+        "BLOG_SHORT_ID_GENERATOR",
+        "blog.short_ids.BlockCounterShortIdGenerator",
+    )
+    return import_string(path)()
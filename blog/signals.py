@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from taggit.models import Tag
+
+from . import cache as entry_cache
+from . import feeds
+from .models import BlogEntry, Comment
+from .tasks import enqueue_search_update
+
+User = get_user_model()
+
+
+def _invalidate(pk):
+    # Drop the entry now and again once the transaction commits, so a
+    # concurrent reader can't re-populate the cache with the old row.
+    entry_cache.invalidate_entry(pk)
+    transaction.on_commit(lambda: entry_cache.invalidate_entry(pk))
+
+
+def _invalidate_many(pks):
+    entry_cache.invalidate_entries(pks)
+    transaction.on_commit(lambda: entry_cache.invalidate_entries(pks))
+
+
+@receiver(post_save, sender=BlogEntry)
+def entry_saved(sender, instance, **kwargs):
+    enqueue_search_update(instance)
+    _invalidate(instance.pk)
+    if feeds.in_feeds(instance):
+        feeds.invalidate_entry_feeds(instance)
+    instance._loaded_status = instance.status
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields, **kwargs):
+    # Saves such as last_login's can't rename anyone
+    if instance.pk is None or (
+        update_fields is not None and "username" not in update_fields
+    ):
+        return
+    instance._saved_username = (
+        User.objects.filter(pk=instance.pk).values_list("username", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_on_rename(sender, instance, **kwargs):
+    saved = instance.__dict__.pop("_saved_username", None)
+    if saved is None or saved == instance.username:
+        return
+    # Feeds are keyed by username and, like cached entries, show it
+    feeds.invalidate_all_feeds()
+    _invalidate_many(
+        list(BlogEntry.objects.filter(author=instance).values_list("pk", flat=True))
+    )
+
+
+@receiver(pre_delete, sender=BlogEntry)
+def invalidate_entry_feeds(sender, instance, **kwargs):
+    # Before the delete cascades to the entry's tags
+    if feeds.in_feeds(instance):
+        feeds.invalidate_entry_feeds(instance)
+
+
+@receiver(post_delete, sender=BlogEntry)
+def invalidate_entry_cache(sender, instance, **kwargs):
+    _invalidate(instance.pk)
+
+
+@receiver(m2m_changed, sender=BlogEntry.tags.through)
+def entry_tags_changed(sender, instance, action, pk_set=None, **kwargs):
+    if not isinstance(instance, BlogEntry):
+        return
+    if action == "pre_clear" and feeds.in_feeds(instance):
+        feeds.invalidate_entry_feeds(instance)
+    if action.startswith("post_"):
+        # Tags are part of the entry, so a change counts as an edit for
+        # updated_at and the ETag validator.
+        instance.updated_at = timezone.now()
+        BlogEntry.objects.filter(pk=instance.pk).update(updated_at=instance.updated_at)
+        enqueue_search_update(instance)
+        _invalidate(instance.pk)
+        if feeds.in_feeds(instance):
+            tags = Tag.objects.filter(pk__in=pk_set or ()).values_list(
+                "slug", flat=True
+            )
+            feeds.invalidate_entry_feeds(instance, tags=tags)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_entry_cache_on_comment(sender, instance, created, **kwargs):
+    # The cached entry carries comment_count
+    if created:
+        _invalidate(instance.blog_entry_id)
+
+
+def _deleting_entries(origin):
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is BlogEntry
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    # Comments cascading from their entry's delete: the entry is going too,
+    # and an UPDATE per comment would defeat the fast cascade.
+    if _deleting_entries(origin):
+        return
+    # Clamped: entries from before the counter existed start at 0 until
+    # recount_comments runs.
+    BlogEntry.objects.filter(pk=instance.blog_entry_id).update(
+        comment_count=Greatest(F("comment_count") - 1, 0)
+    )
+    _invalidate(instance.blog_entry_id)
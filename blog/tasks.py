@@ -0,0 +1,231 @@
+"""
+Background tasks for derived data (search vectors and the like).
+
+enqueue() stores a Task row in the caller's transaction, so the work is
+queued exactly when the write commits and survives a restart, and asks the
+worker to run it with transaction.on_commit. A task whose key is already
+pending is not queued again: ten saves of an entry before the worker gets
+to it still mean one run.
+
+BLOG_TASKS_MODE picks who runs queued tasks:
+
+- "thread" (default): a small in-process thread pool, BLOG_TASK_WORKERS
+  threads, started on first use. Each kick also picks up tasks left over
+  from earlier processes.
+- "sync": run them in the committing thread once the transaction commits
+  (tests, local debugging).
+- "off": only queue them; ``manage.py run_tasks`` works the queue.
+
+A failing task is retried with exponential backoff up to
+BLOG_TASK_MAX_ATTEMPTS times and then kept as "failed" for inspection. A
+task stuck in "running" for BLOG_TASK_STALE_SECONDS (its process died) is
+claimed again.
+"""
+
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    IntegrityError,
+    close_old_connections,
+    transaction,
+)
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BlogEntry, Task
+from .search import is_postgres, update_search_vectors
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# How many due tasks one claim attempt looks at
+CLAIM_BATCH = 10
+
+
+def mode():
+    return getattr(settings, "BLOG_TASKS_MODE", "thread")
+
+
+def max_attempts():
+    return getattr(settings, "BLOG_TASK_MAX_ATTEMPTS", 5)
+
+
+def stale_seconds():
+    return getattr(settings, "BLOG_TASK_STALE_SECONDS", 300)
+
+
+def task(name):
+    """Register the decorated function as the handler for task ``name``."""
+
+    def register(func):
+        TASKS[name] = func
+        return func
+
+    return register
+
+
+def enqueue(name, key=None, **args):
+    """
+    Queue task ``name`` with keyword ``args`` to run once the current
+    transaction commits. ``key`` (``name`` by default) deduplicates: while
+    a task with the same key is pending, nothing new is queued.
+    """
+    if name not in TASKS:
+        raise KeyError(f"Unknown task {name!r}")
+    Task.objects.bulk_create(
+        [Task(name=name, key=key or name, args=args)], ignore_conflicts=True
+    )
+    transaction.on_commit(worker.kick)
+
+
+def _due():
+    now = timezone.now()
+    return Q(status=Task.PENDING, run_after__lte=now) | Q(
+        status=Task.RUNNING, updated_at__lt=now - timedelta(seconds=stale_seconds())
+    )
+
+
+def claim():
+    """
+    Mark the next due task as running and return it, or None. The claim is
+    a conditional UPDATE, so concurrent workers never run the same task.
+    """
+    while True:
+        pks = list(
+            Task.objects.filter(_due())
+            .order_by("run_after", "pk")
+            .values_list("pk", flat=True)[:CLAIM_BATCH]
+        )
+        if not pks:
+            return None
+        for pk in pks:
+            claimed = Task.objects.filter(_due(), pk=pk).update(
+                status=Task.RUNNING,
+                attempts=F("attempts") + 1,
+                updated_at=timezone.now(),
+            )
+            if claimed:
+                return Task.objects.get(pk=pk)
+
+
+def run(queued):
+    """Run a claimed task, then delete it or schedule its retry."""
+    try:
+        TASKS[queued.name](**queued.args)
+    except Exception:
+        logger.exception("Task %s failed (attempt %s)", queued.key, queued.attempts)
+        _failed(queued, traceback.format_exc())
+    else:
+        Task.objects.filter(pk=queued.pk).delete()
+
+
+def _failed(queued, error):
+    queued.last_error = error
+    if queued.name not in TASKS or queued.attempts >= max_attempts():
+        queued.status = Task.FAILED
+        queued.save(update_fields=["status", "last_error", "updated_at"])
+        return
+    delay = 2 ** (queued.attempts - 1)
+    queued.status = Task.PENDING
+    queued.run_after = timezone.now() + timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            queued.save(
+                update_fields=["status", "run_after", "last_error", "updated_at"]
+            )
+    except IntegrityError:
+        # The entry changed again meanwhile and a newer run is pending.
+        Task.objects.filter(pk=queued.pk).delete()
+        return
+    worker.kick_later(delay)
+
+
+def drain(limit=None):
+    """Run due tasks until none are left (or ``limit`` ran); return the count."""
+    ran = 0
+    while limit is None or ran < limit:
+        queued = claim()
+        if queued is None:
+            break
+        run(queued)
+        ran += 1
+    return ran
+
+
+class Worker:
+    """
+    In-process runner for BLOG_TASKS_MODE "thread": kick() submits a drain
+    to the pool, or, when every thread is already draining, asks one of
+    them to go round once more so a task queued as it finished isn't missed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._drains = 0
+        self._again = False
+
+    def kick(self):
+        current = mode()
+        if current == "sync":
+            drain()
+            return
+        if current != "thread":
+            return
+        workers = getattr(settings, "BLOG_TASK_WORKERS", 2)
+        with self._lock:
+            if self._drains >= workers:
+                self._again = True
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="blog-tasks"
+                )
+            self._drains += 1
+        self._executor.submit(self._drain)
+
+    def kick_later(self, seconds):
+        if mode() == "thread":
+            timer = threading.Timer(seconds, self.kick)
+            timer.daemon = True
+            timer.start()
+
+    def _drain(self):
+        try:
+            while True:
+                try:
+                    drain()
+                except Exception:
+                    logger.exception("Task worker crashed")
+                with self._lock:
+                    if not self._again:
+                        self._drains -= 1
+                        return
+                    self._again = False
+        finally:
+            close_old_connections()
+
+
+worker = Worker()
+
+
+@task("update_search_vector")
+def update_search_vector(entry_id):
+    update_search_vectors(BlogEntry.objects.filter(pk=entry_id))
+
+
+def enqueue_search_update(entry):
+    """Queue a search vector refresh for ``entry`` (PostgreSQL only)."""
+    if is_postgres(entry._state.db or DEFAULT_DB_ALIAS):
+        enqueue(
+            "update_search_vector",
+            key=f"update_search_vector:{entry.pk}",
+            entry_id=entry.pk,
+        )
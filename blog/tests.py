@@ -1,3 +1,1537 @@
-from django.test import TestCase
+import base64
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlencode, urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    AsyncClient,
+    AsyncRequestFactory,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import db, metrics, throttling
+
+from . import async_views, rendering, tasks
+from . import cache as entry_cache
+from .bulk import EntryImporter
+from .models import (
+    SLUG_SCAN_BATCH,
+    BlogEntry,
+    Comment,
+    ShortIdCounter,
+    Task,
+)
+from .short_ids import BlockCounterShortIdGenerator, counter_to_short_id
+
+User = get_user_model()
+
+
+class ListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            User.objects.create_user(
+                email=f"author{i}@example.com", password="pass", username=f"author{i}"
+            )
+            for i in range(3)
+        ]
+        entries = []
+        for i in range(12):
+            entry = BlogEntry.objects.create(
+                title=f"Entry {i}",
+                content="content",
+                author=cls.authors[i % 3],
+                status="PUBLIC",
+            )
+            entry.tags.add(f"tag{i}", "common")
+            Comment.objects.create(
+                blog_entry=entry, author=cls.authors[(i + 1) % 3], content="hi"
+            )
+            entries.append(entry)
+        cls.entry = entries[0]
+        for i in range(11):
+            Comment.objects.create(
+                blog_entry=cls.entry, author=cls.authors[i % 3], content="more"
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_entry_list_query_count_is_constant(self):
+        url = reverse("entry-list")
+        for page_size in (1, 3, 10):
+            # Validator aggregate, page, prefetch
+            with self.assertNumQueries(3):
+                response = self.client.get(url, {"page_size": page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["results"]), page_size)
+            self.assertTrue(response.data["results"][0]["author"])
+            self.assertIn("common", response.data["results"][0]["tags"])
+
+    def test_comment_list_query_count_is_constant(self):
+        url = reverse("comments-by-entry-id", args=[self.entry.pk])
+        for page_size in (1, 3, 10):
+            # Entry lookup, validator aggregate, page
+            with self.assertNumQueries(3):
+                response = self.client.get(url, {"page_size": page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["results"]), page_size)
+            self.assertTrue(response.data["results"][0]["author"])
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        for i in range(7):
+            BlogEntry.objects.create(
+                title=f"Entry {i}", content="body", author=author, status="PUBLIC"
+            )
+        # A run of tied timestamps spanning several pages
+        tied = BlogEntry.objects.order_by("id")[1:6]
+        BlogEntry.objects.filter(pk__in=tied.values("pk")).update(
+            created_at=timezone.now()
+        )
+
+    def follow(self, client, url, link):
+        seen = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.append([row["id"] for row in response.data["results"]])
+            url = response.data[link]
+            if url:
+                cursor = resolve_cursor(url)
+                self.assertNotIn("o", cursor)
+        return seen
+
+    def test_next_and_previous_links_cross_tied_timestamps(self):
+        expected = list(
+            BlogEntry.objects.order_by("-created_at", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        client = APIClient()
+        for fast in (True, False):
+            with self.subTest(fast=fast), self.settings(BLOG_FAST_READS=fast):
+                url = reverse("entry-list") + "?page_size=2"
+                pages = self.follow(client, url, "next")
+                self.assertEqual([pk for page in pages for pk in page], expected)
+
+                last = client.get(url).data
+                while last["next"]:
+                    last = client.get(last["next"]).data
+                pages = self.follow(client, last["previous"], "previous")
+                self.assertEqual(
+                    [pk for page in reversed(pages) for pk in page], expected[:-1]
+                )
+
+    def test_malformed_cursor_is_not_found(self):
+        url = reverse("entry-list")
+        for position in ("nope", '["x","1"]', '["2024-01-01 00:00:00+00:00"]'):
+            cursor = base64.b64encode(urlencode({"p": position}).encode()).decode()
+            response = APIClient().get(url, {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+def resolve_cursor(url):
+    encoded = parse_qs(urlsplit(url).query)["cursor"][0]
+    return parse_qs(base64.b64decode(encoded).decode())
+
+
+class EntryCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.entry = BlogEntry.objects.create(
+            title="Cached", content="content", author=cls.author, status="PUBLIC"
+        )
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.client = APIClient()
+
+    def test_repeat_lookups_hit_the_cache(self):
+        urls = [
+            reverse("entry-by-id", args=[self.entry.pk]),
+            reverse("entry-by-slug", args=[self.entry.slug]),
+            reverse("entry-by-short-url", args=[self.entry.short_url_id]),
+        ]
+        self.client.get(urls[0])
+        for url in urls:
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.data["title"], "Cached")
+        self.assertEqual(
+            metrics.registry.cache_lookups(entry_cache.METRICS_NAME),
+            {"hits": 3, "misses": 1},
+        )
+        self.assertIn(
+            'cache_lookups_total{cache="blog_entry",result="hit"} 3',
+            metrics.registry.render(),
+        )
+
+    def test_author_rename_invalidates(self):
+        url = reverse("entry-by-id", args=[self.entry.pk])
+        etag = self.client.get(url)["ETag"]
+        self.author.username = "renamed"
+        self.author.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["author"], "renamed")
+
+    def test_save_and_tag_changes_invalidate(self):
+        url = reverse("entry-by-short-url", args=[self.entry.short_url_id])
+        self.client.get(url)
+
+        self.entry.title = "Renamed"
+        self.entry.save()
+        self.assertEqual(self.client.get(url).data["title"], "Renamed")
+
+        self.entry.tags.add("fresh")
+        self.assertEqual(self.client.get(url).data["tags"], ["fresh"])
+
+        self.entry.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_cached_unlisted_entry_stays_private_to_others(self):
+        unlisted = BlogEntry.objects.create(
+            title="Hidden", content="content", author=self.author, status="UNLISTED"
+        )
+        url = reverse("entry-by-id", args=[unlisted.pk])
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class SlugAllocationTests(TestCase):
+    def test_duplicate_titles_continue_after_highest_suffix(self):
+        author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        BlogEntry.objects.create(title="Hello World 2", content="", author=author)
+        slugs = []
+        for _ in range(12):
+            with self.assertNumQueries(1):
+                slug = BlogEntry.allocate_slug("Hello World")
+            slugs.append(slug)
+            BlogEntry.objects.create(title="Hello World", content="", author=author)
+        # hello-world-2 belongs to "Hello World 2", so it is stepped over
+        self.assertEqual(
+            slugs,
+            ["hello-world", "hello-world-1"]
+            + [f"hello-world-{i}" for i in range(3, 13)],
+        )
+
+    def test_numbers_in_other_titles_are_not_continued_from(self):
+        author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        for title in ("Hello World", "Hello World 2024", "Hello World 2025"):
+            BlogEntry.objects.create(title=title, content="", author=author)
+        self.assertEqual(BlogEntry.allocate_slug("Hello World"), "hello-world-1")
+        self.assertEqual(
+            BlogEntry.allocate_slugs("hello world!", 3),
+            ["hello-world-1", "hello-world-2", "hello-world-3"],
+        )
+
+        # A long run of other titles' numbers takes more than one batch
+        for year in range(1990, 1990 + SLUG_SCAN_BATCH):
+            BlogEntry.objects.create(
+                title=f"Hello World {year}", content="", author=author
+            )
+        BlogEntry.objects.create(
+            title="Hello World", slug="hello-world-7", content="", author=author
+        )
+        BlogEntry.objects.create(
+            title="Renamed", slug="hello-world-8", content="", author=author
+        )
+        with self.assertNumQueries(2):
+            slugs = BlogEntry.allocate_slugs("Hello World", 2)
+        self.assertEqual(slugs, ["hello-world-9", "hello-world-10"])
+
+    def test_suffixed_slugs_of_long_titles_fit_the_column(self):
+        author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        max_length = BlogEntry._meta.get_field("slug").max_length
+        title = "a" * max_length
+        for _ in range(11):
+            BlogEntry.objects.create(title=title, content="", author=author)
+
+        slugs = list(BlogEntry.objects.values_list("slug", flat=True))
+        slugs += BlogEntry.allocate_slugs(title, 3)
+        self.assertEqual(len(set(slugs)), 14)
+        self.assertTrue(all(len(slug) <= max_length for slug in slugs))
+        self.assertIn(title, slugs)
+        self.assertEqual(BlogEntry.allocate_slug(title).rsplit("-", 1)[1], "11")
+
+
+class ShortIdTests(TestCase):
+    def test_generated_ids_are_unique_and_fit_the_column(self):
+        max_length = BlogEntry._meta.get_field("short_url_id").max_length
+        ids = [counter_to_short_id(value) for value in range(100000)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(len(short_id) <= max_length for short_id in ids))
+
+    def test_block_generator_reserves_ids_once(self):
+        generator = BlockCounterShortIdGenerator()
+        first = generator.generate_many(3)
+        second = generator.generate_many(3)
+        self.assertEqual(len(set(first + second)), 6)
+        self.assertEqual(ShortIdCounter.objects.get().value, 6)
+
+
+class CommentCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.entry = BlogEntry.objects.create(
+            title="Counted", content="content", author=cls.author, status="PUBLIC"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def add_comment(self):
+        return Comment.objects.create(
+            blog_entry=self.entry, author=self.author, content="hi"
+        )
+
+    def test_numbers_and_count_track_inserts_and_deletes(self):
+        comments = [self.add_comment() for _ in range(3)]
+        self.assertEqual([c.comment_number for c in comments], [1, 2, 3])
+
+        comments[2].delete()
+        self.assertEqual(self.add_comment().comment_number, 4)
+
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.comment_count, 3)
+        self.assertEqual(self.entry.next_comment_number, 5)
+
+    def test_entries_with_unset_counters_accept_comments_and_deletes(self):
+        comments = [self.add_comment() for _ in range(2)]
+        # As left by the migration adding the counters, before recount_comments
+        BlogEntry.objects.update(next_comment_number=1, comment_count=0)
+
+        self.assertEqual(self.add_comment().comment_number, 3)
+        comments[0].delete()
+        comments[1].delete()
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.next_comment_number, 4)
+        self.assertEqual(self.entry.comment_count, 0)
+
+    def test_entry_save_keeps_counters_added_since_load(self):
+        stale = BlogEntry.objects.get(pk=self.entry.pk)
+        self.add_comment()
+        stale.title = "Edited"
+        stale.save()
+
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.comment_count, 1)
+        self.assertEqual(self.add_comment().comment_number, 2)
+
+    def test_entry_delete_cascades_without_a_query_per_comment(self):
+        def delete_queries(comments):
+            entry = BlogEntry.objects.create(
+                title="Doomed",
+                content="content",
+                author=self.author,
+                comment_count=comments,
+                next_comment_number=comments + 1,
+            )
+            Comment.objects.bulk_create(
+                Comment(
+                    blog_entry=entry, author=self.author, content="hi", comment_number=n
+                )
+                for n in range(1, comments + 1)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                entry.delete()
+            return len(queries)
+
+        self.assertEqual(delete_queries(50), delete_queries(1))
+        self.assertFalse(Comment.objects.exclude(blog_entry=self.entry).exists())
+
+    def test_comment_count_is_serialized(self):
+        self.add_comment()
+        response = APIClient().get(reverse("entry-by-id", args=[self.entry.pk]))
+        self.assertEqual(response.data["comment_count"], 1)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.other = User.objects.create_user(
+            email="other@example.com", password="pass", username="other"
+        )
+        cls.in_title = BlogEntry.objects.create(
+            title="Django tips", content="misc", author=cls.author, status="PUBLIC"
+        )
+        cls.in_content = BlogEntry.objects.create(
+            title="Misc", content="some django notes", author=cls.author, status="PUBLIC"
+        )
+        cls.in_tags = BlogEntry.objects.create(
+            title="Tagged", content="misc", author=cls.author, status="PUBLIC"
+        )
+        cls.in_tags.tags.add("django")
+        cls.private = BlogEntry.objects.create(
+            title="Private django", content="misc", author=cls.other, status="PRIVATE"
+        )
+
+    def search(self, query, user=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(reverse("entry-search"), {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return [entry["id"] for entry in response.data["results"]]
+
+    def test_results_are_ranked_title_then_tags_then_content(self):
+        self.assertEqual(
+            self.search("django"),
+            [self.in_title.pk, self.in_tags.pk, self.in_content.pk],
+        )
+
+    def test_private_entries_only_found_by_their_author(self):
+        self.assertNotIn(self.private.pk, self.search("private"))
+        self.assertEqual(self.search("private", user=self.other), [self.private.pk])
+
+    def test_query_is_required(self):
+        response = APIClient().get(reverse("entry-search"))
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.entry = BlogEntry.objects.create(
+            title="Polled", content="content", author=cls.author, status="PUBLIC"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assertRevalidates(self, url, change, queries):
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertFalse(response.has_header("Last-Modified"))
+
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def add_comment(self):
+        Comment.objects.create(blog_entry=self.entry, author=self.author, content="hi")
+
+    def test_entry_retrieve(self):
+        url = reverse("entry-by-slug", args=[self.entry.slug])
+        self.assertRevalidates(url, self.add_comment, queries=0)
+
+    def test_entry_retrieve_tag_change(self):
+        url = reverse("entry-by-id", args=[self.entry.pk])
+        self.assertRevalidates(url, lambda: self.entry.tags.add("new"), queries=0)
+
+    def test_entry_list(self):
+        url = reverse("entry-list")
+        self.assertRevalidates(url, self.add_comment, queries=1)
+
+    def test_author_renames_and_backfills_change_list_etags(self):
+        self.add_comment()
+        urls = [
+            reverse("entry-list"),
+            reverse("comments-by-entry-id", args=[self.entry.pk]),
+        ]
+
+        def changes_etags(change):
+            etags = [self.client.get(url)["ETag"] for url in urls]
+            change()
+            for url, etag in zip(urls, etags):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200, url)
+
+        def rename():
+            self.author.username = "renamed"
+            self.author.save()
+
+        changes_etags(rename)
+        changes_etags(
+            lambda: call_command(
+                "rerender_content", all=True, stdout=StringIO(), stderr=StringIO()
+            )
+        )
+        etag = self.client.get(urls[0])["ETag"]
+        call_command("backfill_excerpts", stdout=StringIO())
+        response = self.client.get(urls[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_entry_list_revalidates_against_the_page_only(self):
+        url = reverse("entry-list")
+        etag = self.client.get(url)["ETag"]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        sql = ctx.captured_queries[0]["sql"].upper()
+        self.assertIn("LIMIT", sql)
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("SUM(", sql)
+
+        self.entry.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_comment_list(self):
+        self.add_comment()
+        url = reverse("comments-by-entry-id", args=[self.entry.pk])
+
+        def delete_and_add():
+            Comment.objects.get().delete()
+            self.add_comment()
+
+        self.assertRevalidates(url, delete_and_add, queries=2)
+
+    def test_if_modified_since_alone_never_gets_stale_304(self):
+        self.add_comment()
+        since = http_date(time.time() + 3600)
+        urls = [
+            reverse("entry-by-id", args=[self.entry.pk]),
+            reverse("entry-list"),
+            reverse("comments-by-entry-id", args=[self.entry.pk]),
+        ]
+        for url in urls:
+            self.client.get(url)
+        self.add_comment()
+        Comment.objects.first().delete()
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+                self.assertEqual(response.status_code, 200)
+
+
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.other = User.objects.create_user(
+            email="other@example.com", password="pass", username="other"
+        )
+        BlogEntry.objects.create(title="Same", content="c", author=cls.author)
+
+    def post(self, records, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        body = "\n".join(
+            record if isinstance(record, str) else json.dumps(record)
+            for record in records
+        )
+        return client.post(
+            reverse("entry-import"), body, content_type="application/x-ndjson"
+        )
+
+    def test_import_reports_bad_rows_and_keeps_the_rest(self):
+        records = [
+            {
+                "title": "Same",
+                "content": "first",
+                "status": "PUBLIC",
+                "tags": ["a", "b"],
+                "created_at": "2020-01-01T00:00:00Z",
+                "comments": [{"content": "one"}, {"content": "two"}],
+            },
+            "{not json",
+            {"title": "Same", "content": "second", "status": "BOGUS"},
+            {"title": "Same", "content": "third", "author": "other"},
+            {"title": "Same", "content": "fourth"},
+        ]
+        response = self.post(records, self.author)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["entries"], 2)
+        self.assertEqual(response.data["comments"], 2)
+        self.assertEqual([e["line"] for e in response.data["errors"]], [2, 3, 4])
+
+        first = BlogEntry.objects.get(content="first")
+        self.assertEqual(first.slug, "same-1")
+        self.assertEqual(first.created_at.year, 2020)
+        self.assertEqual(sorted(first.tags.names()), ["a", "b"])
+        self.assertEqual(
+            list(first.comments.values_list("comment_number", flat=True)), [1, 2]
+        )
+        self.assertEqual(BlogEntry.objects.get(content="fourth").slug, "same-2")
+
+        # Counters continue from the imported comments
+        comment = Comment.objects.create(
+            blog_entry=first, author=self.author, content="x"
+        )
+        self.assertEqual(comment.comment_number, 3)
+
+    def test_titles_sharing_a_slug_import_in_one_batch(self):
+        titles = ["Hello World", "hello world!", "Hello, World", "Same"]
+        records = [{"title": title, "content": "imported"} for title in titles]
+        with mock.patch.object(
+            EntryImporter,
+            "bulk_insert",
+            autospec=True,
+            side_effect=EntryImporter.bulk_insert,
+        ) as bulk_insert:
+            response = self.post(records, self.author)
+        self.assertEqual(response.data["entries"], 4)
+        self.assertEqual(response.data["errors"], [])
+        # No unique-slug failure, so no row-by-row fallback
+        self.assertEqual(bulk_insert.call_count, 1)
+        self.assertEqual(
+            [
+                BlogEntry.objects.get(title=title, content="imported").slug
+                for title in titles
+            ],
+            ["hello-world", "hello-world-1", "hello-world-2", "same-1"],
+        )
+
+    def test_staff_may_import_for_other_users(self):
+        staff = User.objects.create_user(
+            email="staff@example.com", password="pass", username="staff", is_staff=True
+        )
+        response = self.post(
+            [{"title": "T", "content": "c", "author": "other"}], staff
+        )
+        self.assertEqual(response.data["entries"], 1)
+        self.assertEqual(BlogEntry.objects.get(title="T").author, self.other)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            email="staff@example.com", password="pass", username="staff", is_staff=True
+        )
+        cls.old = BlogEntry.objects.create(
+            title="Old", content="c", author=cls.staff, status="PUBLIC"
+        )
+        cls.old.tags.add("kept")
+        Comment.objects.create(blog_entry=cls.old, author=cls.staff, content="hi")
+        BlogEntry.objects.filter(pk=cls.old.pk).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        Comment.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        cls.new = BlogEntry.objects.create(
+            title="New", content="c", author=cls.staff, status="PRIVATE"
+        )
+
+    def export(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        response = client.get(reverse("entry-export"), params)
+        self.assertEqual(response.status_code, 200)
+        body = b"".join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_export_includes_tags_and_comments(self):
+        records = self.export()
+        self.assertEqual([r["title"] for r in records], ["Old", "New"])
+        self.assertEqual(records[0]["tags"], ["kept"])
+        self.assertEqual(records[0]["comments"][0]["content"], "hi")
+
+    def test_filters(self):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        self.assertEqual([r["title"] for r in self.export(since=since)], ["New"])
+        self.assertEqual([r["title"] for r in self.export(status="PUBLIC")], ["Old"])
+
+        Comment.objects.create(blog_entry=self.old, author=self.staff, content="new")
+        self.assertEqual(
+            [r["title"] for r in self.export(since=since)], ["Old", "New"]
+        )
+
+    def test_export_streams_from_an_async_iterator_under_asgi(self):
+        token = AccessToken.for_user(self.staff)
+
+        async def export():
+            response = await AsyncClient().get(
+                reverse("entry-export"), headers={"Authorization": f"Bearer {token}"}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            return [json.loads(line) async for line in response.streaming_content]
+
+        records = async_to_sync(export)()
+        self.assertEqual([r["title"] for r in records], ["Old", "New"])
+        self.assertEqual(records[0]["comments"][0]["content"], "hi")
+
+    def test_export_is_staff_only(self):
+        self.assertEqual(APIClient().get(reverse("entry-export")).status_code, 401)
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.entry = BlogEntry.objects.create(
+            title="Long", content="word " * 500, author=cls.author, status="PUBLIC"
+        )
+        Comment.objects.create(blog_entry=cls.entry, author=cls.author, content="hi")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_list_shows_excerpt_instead_of_content(self):
+        entry = self.client.get(reverse("entry-list")).data["results"][0]
+        self.assertNotIn("content", entry)
+        self.assertLessEqual(len(entry["excerpt"]), 280)
+        self.assertTrue(entry["excerpt"].startswith("word word"))
+
+    def test_fields_limits_json_and_select(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("entry-list"), {"fields": "id,title"})
+        self.assertEqual(set(response.data["results"][0]), {"id", "title"})
+        page_sql = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn('"excerpt"', page_sql)
+        # Tags aren't requested, so they aren't prefetched either
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_omit_on_retrieve_and_comments(self):
+        url = reverse("entry-by-id", args=[self.entry.pk])
+        for _ in range(2):  # miss, then cache hit
+            data = self.client.get(url, {"omit": "content,tags"}).data
+            self.assertNotIn("content", data)
+            self.assertIn("title", data)
+
+        url = reverse("comments-by-entry-id", args=[self.entry.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"omit": "content"})
+        self.assertNotIn("content", response.data["results"][0])
+        self.assertNotIn('"content"', ctx.captured_queries[-1]["sql"])
+
+
+class FastReadTests(TestCase):
+    """
+    The values()-based read path must render exactly like the serializers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="authör"
+        )
+        for i in range(5):
+            entry = BlogEntry.objects.create(
+                title=f"Entry {i}   ünïcode",
+                content="body " * 100,
+                author=cls.author,
+                status="PUBLIC",
+            )
+            entry.tags.add("zeta", "alpha", f"tag{i}")
+            for _ in range(3):
+                Comment.objects.create(
+                    blog_entry=entry, author=cls.author, content="\"quoted\" ✓"
+                )
+        cls.entry = entry
+
+    def assertSameBytes(self, url, params=None):
+        client = APIClient()
+        with self.settings(BLOG_FAST_READS=True):
+            fast = client.get(url, params, HTTP_ACCEPT="application/json")
+        with self.settings(BLOG_FAST_READS=False):
+            slow = client.get(url, params, HTTP_ACCEPT="application/json")
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(fast.content, JSONRenderer().render(slow.data))
+
+    def test_entry_list(self):
+        self.assertSameBytes(reverse("entry-list"), {"page_size": 4})
+        self.assertSameBytes(reverse("entry-list"), {"fields": "id,tags,created_at"})
+        self.assertSameBytes(reverse("entry-list"), {"omit": "tags"})
+
+    def test_comment_list_and_retrieve(self):
+        self.assertSameBytes(reverse("comments-by-entry-id", args=[self.entry.pk]))
+        self.assertSameBytes(
+            reverse("comments-by-entry-slug", args=[self.entry.slug]),
+            {"omit": "content"},
+        )
+        self.assertSameBytes(
+            reverse("comment-detail-by-entry-id", args=[self.entry.pk, 2])
+        )
+
+
+class AsyncReadTests(TestCase):
+    """
+    The native async read views must answer exactly like the DRF views.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        for i in range(4):
+            entry = BlogEntry.objects.create(
+                title=f"Entry {i}", content="body", author=cls.author, status="PUBLIC"
+            )
+            entry.tags.add("shared", f"tag{i}")
+            Comment.objects.create(blog_entry=entry, author=cls.author, content="hi")
+        cls.private = BlogEntry.objects.create(
+            title="Private", content="body", author=cls.author, status="PRIVATE"
+        )
+        cls.entry = entry
+        cls.token = str(AccessToken.for_user(cls.author))
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameResponse(self, view, url, token=None, params=None, **kwargs):
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        expected = APIClient().get(url, params, headers=headers)
+        request = AsyncRequestFactory().get(url, params, headers=headers)
+        actual = async_to_sync(view)(request, **kwargs)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        return actual
+
+    def test_entry_detail(self):
+        for lookup, value, name in [
+            ("pk", self.entry.pk, "entry-by-id"),
+            ("slug", self.entry.slug, "entry-by-slug"),
+            ("short_url_id", self.entry.short_url_id, "entry-by-short-url"),
+        ]:
+            url = reverse(name, args=[value])
+            self.assertSameResponse(async_views.entry_detail, url, **{lookup: value})
+        response = self.assertSameResponse(
+            async_views.entry_detail,
+            reverse("entry-by-id", args=[self.private.pk]),
+            pk=self.private.pk,
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_entry_detail_for_author(self):
+        url = reverse("entry-by-id", args=[self.private.pk])
+        self.assertSameResponse(
+            async_views.entry_detail, url, token=self.token, pk=self.private.pk
+        )
+
+    def test_entry_list(self):
+        url = reverse("entry-list")
+        self.assertSameResponse(async_views.entry_list, url, params={"page_size": 2})
+        self.assertSameResponse(async_views.entry_list, url, token=self.token)
+
+    def test_comment_list(self):
+        url = reverse("comments-by-entry-slug", args=[self.entry.slug])
+        self.assertSameResponse(
+            async_views.comment_list, url, blog_entry_slug=self.entry.slug
+        )
+
+    def test_bad_token(self):
+        response = self.assertSameResponse(
+            async_views.entry_list, reverse("entry-list"), token="garbage"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(BLOG_FAST_READS=False)
+    def test_lists_without_fast_reads(self):
+        url = reverse("entry-list")
+        self.assertSameResponse(async_views.entry_list, url, params={"fields": "title"})
+        self.assertSameResponse(async_views.entry_list, url, token=self.token)
+        url = reverse("comments-by-entry-id", args=[self.entry.pk])
+        self.assertSameResponse(
+            async_views.comment_list, url, blog_entry_pk=self.entry.pk
+        )
+
+    @override_settings(
+        THROTTLE_ROUTES={"entry-list": {"ip": "1/min", "methods": ["GET"]}}
+    )
+    def test_route_throttle(self):
+        url = reverse("entry-list")
+        responses = []
+        for _ in range(2):
+            request = AsyncRequestFactory().get(url)
+            request.resolver_match = resolve(url)
+            responses.append(async_to_sync(async_views.entry_list)(request))
+        self.assertEqual(responses[0].status_code, 200)
+        self.assertEqual(responses[1].status_code, 429)
+        self.assertTrue(responses[1].has_header("Retry-After"))
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.entry = BlogEntry.objects.create(
+            title="Entry", content="body", author=cls.author, status="PUBLIC"
+        )
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+
+    def test_records_per_route_metrics(self):
+        client = APIClient()
+        client.get(reverse("entry-list"))
+        client.get(reverse("entry-list"))
+        client.get(reverse("entry-by-id", args=[0]))
+        text = metrics.registry.render()
+
+        labels = 'view="entry-list",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 2', text)
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 2", text)
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="3"}} 2', text)
+        self.assertIn(f"http_request_db_queries_sum{{{labels}}} 6", text)
+        self.assertIn(f"http_response_size_bytes_count{{{labels}}} 2", text)
+        self.assertRegex(
+            text, rf"http_request_serializer_seconds_total\{{{labels}\}} 0\.0*[1-9]"
+        )
+        self.assertIn(
+            'http_requests_total{view="entry-by-id",method="GET",status="404"} 1', text
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_view_requires_token(self):
+        factory = RequestFactory()
+        self.assertEqual(metrics.metrics_view(factory.get("/metrics")).status_code, 403)
+        response = metrics.metrics_view(
+            factory.get("/metrics", headers={"Authorization": "Bearer secret"})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE http_requests_total counter", response.content)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BenchmarkCommandTests(TestCase):
+    def test_seed_data_and_bench_api(self):
+        call_command(
+            "seed_data", users=3, entries=20, comments=2, tags=5, stdout=StringIO()
+        )
+        self.assertEqual(User.objects.filter(username__startswith="seed-").count(), 3)
+        self.assertEqual(BlogEntry.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 40)
+
+        out = StringIO()
+        call_command("bench_api", requests=2, json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(len(results), 29)
+        self.assertEqual(BlogEntry.objects.count(), 20)
+
+
+class VisibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.other = User.objects.create_user(
+            email="other@example.com", password="pass", username="other"
+        )
+        cls.entries = {
+            status: BlogEntry.objects.create(
+                title=status, content="body", author=cls.author, status=status
+            )
+            for status in ("PUBLIC", "UNLISTED", "PRIVATE")
+        }
+
+    def test_visible_to(self):
+        self.assertEqual(
+            set(BlogEntry.objects.visible_to(self.author)),
+            set(self.entries.values()),
+        )
+        self.assertEqual(
+            list(BlogEntry.objects.visible_to(self.other)), [self.entries["PUBLIC"]]
+        )
+        self.assertEqual(
+            list(BlogEntry.objects.visible_to(AnonymousUser())),
+            [self.entries["PUBLIC"]],
+        )
+
+    def test_comments_of_hidden_entry_are_not_found(self):
+        private = self.entries["PRIVATE"]
+        Comment.objects.create(blog_entry=private, author=self.author, content="hi")
+        url = reverse("comments-by-entry-id", args=[private.pk])
+        client = APIClient()
+        client.force_authenticate(self.other)
+        self.assertEqual(client.get(url).status_code, 404)
+        client.force_authenticate(self.author)
+        self.assertEqual(client.get(url).status_code, 200)
+
+    def test_list_query_uses_indexes(self):
+        queryset = BlogEntry.objects.visible_to(self.other).filter(
+            created_at__lt=timezone.now()
+        )[:10]
+        if connection.vendor == "postgresql":
+            # The table is tiny, so take sequential scans off the table
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        self.assertNotIn("DISTINCT", str(queryset.query))
+        self.assertIn("blog_entry_status_created", plan)
+        self.assertIn("blog_entry_author_created", plan)
+        if connection.vendor == "postgresql":
+            # A page is merged from one ordered, limited scan per index,
+            # not a BitmapOr of every visible entry sorted afterwards
+            self.assertIn("UNION ALL", str(queryset.query))
+            self.assertNotIn("BitmapOr", plan)
+            self.assertIn("Append", plan)
+            self.assertEqual(plan.count("Limit"), 3)
+
+    def test_merged_pages_match_the_or_query(self):
+        for status in ("PUBLIC", "UNLISTED", "PRIVATE"):
+            for owner in (self.author, self.other):
+                BlogEntry.objects.create(
+                    title=status, content="body", author=owner, status=status
+                )
+        queryset = BlogEntry.objects.visible_to(self.other)
+        # Iterating runs the OR query; slicing merges on PostgreSQL
+        expected = list(queryset)
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(list(queryset[:10]), expected)
+        self.assertEqual(list(queryset[1:3]), expected[1:3])
+        self.assertEqual(
+            list(queryset.order_by("created_at", "id")[:2]), expected[::-1][:2]
+        )
+        self.assertEqual(
+            list(queryset.values_list("pk", flat=True)[:10]),
+            [entry.pk for entry in expected],
+        )
+
+
+class CommentParentEntryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        cls.entry = BlogEntry.objects.create(
+            title="Entry", content="body", author=cls.author, status="PUBLIC"
+        )
+        cls.comment = Comment.objects.create(
+            blog_entry=cls.entry, author=cls.author, content="hi"
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def detail_url(self, name, value):
+        return reverse(name, args=[value, self.comment.comment_number])
+
+    def test_detail_is_one_joined_query(self):
+        for name, value in [
+            ("comment-detail-by-entry-id", self.entry.pk),
+            ("comment-detail-by-entry-slug", self.entry.slug),
+            ("comment-detail-by-entry-short", self.entry.short_url_id),
+        ]:
+            with self.assertNumQueries(1):
+                response = self.client.get(self.detail_url(name, value))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["author"], "author")
+
+    def test_create_resolves_entry_once(self):
+        url = reverse("comments-by-entry-slug", args=[self.entry.slug])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {"content": "again"})
+        self.assertEqual(response.status_code, 201)
+        entry_selects = [
+            q["sql"]
+            for q in queries
+            if q["sql"].startswith("SELECT") and '"blog_blogentry"."slug" =' in q["sql"]
+        ]
+        self.assertEqual(len(entry_selects), 1)
+
+    def test_other_users_cannot_edit(self):
+        other = User.objects.create_user(
+            email="other@example.com", password="pass", username="other"
+        )
+        self.client.force_authenticate(other)
+        url = self.detail_url("comment-detail-by-entry-id", self.entry.pk)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.patch(url, {"content": "x"}).status_code, 403)
+
+
+@override_settings(
+    DATABASE_REPLICAS=settings.DATABASE_REPLICAS or ["replica_0", "replica_1"]
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Run with SQLITE_REPLICAS=2 to route to real (test-mirror) replica
+    databases; rows must be committed for the replica connections to see
+    them, hence TransactionTestCase. Without replicas configured, the chosen
+    alias is swapped for "default" and only the routing decisions are
+    checked.
+    """
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+        self.entry = BlogEntry.objects.create(
+            title="Entry", content="body", author=self.author, status="PUBLIC"
+        )
+        cache.clear()
+        self.replica_reads = []
+        patcher = mock.patch("core.db.random.choice", side_effect=self.choose)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def choose(self, aliases):
+        self.replica_reads.append(aliases)
+        return aliases[0] if settings.DATABASES.keys() >= set(aliases) else "default"
+
+    def test_safe_reads_use_replicas(self):
+        response = self.client.get(reverse("entry-by-id", args=[self.entry.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.replica_reads)
+        self.assertNotIn(db.PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_client_to_primary(self):
+        self.client.force_authenticate(self.author)
+        url = reverse("entry-by-id", args=[self.entry.pk])
+        response = self.client.patch(url, {"content": "edited"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(db.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.replica_reads, [])
+
+        # Same user without the cookie is still pinned through the cache
+        self.client.cookies.clear()
+        self.client.get(url)
+        self.assertEqual(self.replica_reads, [])
+
+        cache.clear()
+        self.client.get(url)
+        self.assertTrue(self.replica_reads)
+
+    def test_feeds_are_rebuilt_from_primary(self):
+        response = self.client.get(reverse("feed-rss"))
+        self.assertContains(response, "Entry")
+        self.assertEqual(self.replica_reads, [])
+
+    def test_admin_and_commands_use_primary(self):
+        self.client.get("/admin/login/")
+        list(BlogEntry.objects.all())
+        self.assertEqual(self.replica_reads, [])
+
+
+class RenderedContentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass", username="author"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_content_is_rendered_and_sanitized_on_save(self):
+        entry = BlogEntry.objects.create(
+            title="Entry",
+            content="Some **bold** text <script>alert(1)</script> [x](javascript:y)",
+            author=self.author,
+            status="PUBLIC",
+        )
+        self.assertIn("<strong>bold</strong>", entry.content_html)
+        self.assertNotIn("<script", entry.content_html)
+        self.assertNotIn("javascript:", entry.content_html)
+        self.assertEqual(entry.content_html_version, rendering.RENDERER_VERSION)
+
+        entry.content = "*edited*"
+        entry.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.content_html, "<p><em>edited</em></p>")
+
+        response = self.client.get(reverse("entry-by-id", args=[entry.pk]))
+        self.assertEqual(response.data["content_html"], "<p><em>edited</em></p>")
+
+    def test_comments_are_rendered(self):
+        entry = BlogEntry.objects.create(
+            title="Entry", content="body", author=self.author, status="PUBLIC"
+        )
+        url = reverse("comments-by-entry-id", args=[entry.pk])
+        response = self.client.post(url, {"content": "`code`"})
+        self.assertEqual(response.data["content_html"], "<p><code>code</code></p>")
+
+        comment = Comment.objects.get()
+        comment.content = "_changed_"
+        comment.save(update_fields=["content"])
+        comment.refresh_from_db()
+        self.assertEqual(comment.content_html, "<p><em>changed</em></p>")
+
+    def test_rerender_command_refreshes_outdated_rows(self):
+        entry = BlogEntry.objects.create(
+            title="Entry", content="**x**", author=self.author, status="PUBLIC"
+        )
+        Comment.objects.create(blog_entry=entry, author=self.author, content="*y*")
+        BlogEntry.objects.update(content_html="stale", content_html_version=0)
+        Comment.objects.update(content_html="stale", content_html_version=0)
+        url = reverse("entry-by-id", args=[entry.pk])
+        etag = self.client.get(url)["ETag"]
+
+        out, err = StringIO(), StringIO()
+        call_command("rerender_content", stdout=out, stderr=err)
+        self.assertIn("Re-rendered 1 entries and 1 comments", out.getvalue())
+        self.assertIn(entry_cache.PER_PROCESS_WARNING, err.getvalue())
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.content_html, "<p><strong>x</strong></p>")
+        self.assertEqual(Comment.objects.get().content_html, "<p><em>y</em></p>")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["content_html"], entry.content_html)
+
+
+task_calls = []
+
+
+@tasks.task("test-record")
+def record_task(**args):
+    task_calls.append(args)
+
+
+@tasks.task("test-fail")
+def failing_task():
+    raise ValueError("boom")
+
+
+@override_settings(BLOG_TASKS_MODE="sync", BLOG_TASK_MAX_ATTEMPTS=2)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        task_calls.clear()
+
+    def test_pending_key_is_queued_once_and_run_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue("test-record", key="entry:1", n=1)
+            tasks.enqueue("test-record", key="entry:1", n=2)
+            self.assertEqual(Task.objects.count(), 1)
+            self.assertEqual(task_calls, [])
+        self.assertEqual(task_calls, [{"n": 1}])
+        self.assertFalse(Task.objects.exists())
+
+    def test_running_task_does_not_swallow_a_new_change(self):
+        Task.objects.create(name="test-record", key="entry:1", status=Task.RUNNING)
+        with self.captureOnCommitCallbacks(execute=False):
+            tasks.enqueue("test-record", key="entry:1", n=2)
+        self.assertEqual(Task.objects.filter(key="entry:1").count(), 2)
+
+    def test_failures_are_retried_with_backoff_then_kept(self):
+        with override_settings(BLOG_TASKS_MODE="off"):
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.enqueue("test-fail")
+            with self.assertLogs("blog.tasks", "ERROR"):
+                self.assertEqual(tasks.drain(), 1)
+            queued = Task.objects.get()
+            self.assertEqual(queued.status, Task.PENDING)
+            self.assertEqual(queued.attempts, 1)
+            self.assertGreater(queued.run_after, timezone.now())
+            self.assertEqual(tasks.drain(), 0)
+
+            Task.objects.update(run_after=timezone.now())
+            with self.assertLogs("blog.tasks", "ERROR"):
+                tasks.drain()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertEqual(queued.attempts, 2)
+        self.assertIn("ValueError: boom", queued.last_error)
+
+    def test_stale_running_task_is_claimed_again(self):
+        Task.objects.create(
+            name="test-record", key="test-record", args={"n": 3}, status=Task.RUNNING
+        )
+        self.assertEqual(tasks.drain(), 0)
+        Task.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(tasks.drain(), 1)
+        self.assertEqual(task_calls, [{"n": 3}])
+
+    def test_run_tasks_command(self):
+        with override_settings(BLOG_TASKS_MODE="off"):
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.enqueue("test-record", n=4)
+        self.assertEqual(task_calls, [])
+        out = StringIO()
+        call_command("run_tasks", stdout=out)
+        self.assertIn("Ran 1 tasks.", out.getvalue())
+        self.assertEqual(task_calls, [{"n": 4}])
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="feeds@example.com", password="pass", username="feeder"
+        )
+        cls.public = BlogEntry.objects.create(
+            title="Public post", content="*hello*", author=cls.author, status="PUBLIC"
+        )
+        cls.public.tags.add("django")
+        cls.private = BlogEntry.objects.create(
+            title="Private post", content="secret", author=cls.author
+        )
+        cls.private.tags.add("python")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_list_public_entries(self):
+        response = self.client.get(reverse("feed-rss"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("application/rss+xml"))
+        self.assertContains(response, "Public post")
+        self.assertContains(response, "&lt;em&gt;hello&lt;/em&gt;")
+        self.assertNotContains(response, "Private post")
+
+        response = self.client.get(reverse("author-feed-atom", args=["feeder"]))
+        self.assertTrue(response["Content-Type"].startswith("application/atom+xml"))
+        self.assertContains(response, "Public post")
+        self.assertContains(
+            self.client.get(reverse("tag-feed-rss", args=["django"])), "Public post"
+        )
+        self.assertEqual(
+            self.client.get(reverse("tag-feed-rss", args=["missing"])).status_code,
+            404,
+        )
+
+    def test_entries_without_slug_are_linked_by_short_url(self):
+        entry = BlogEntry.objects.create(
+            title="سلام دنیا", content="متن", author=self.author, status="PUBLIC"
+        )
+        self.assertEqual(entry.slug, "")
+        response = self.client.get(reverse("feed-rss"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, reverse("entry-by-short-url", args=[entry.short_url_id])
+        )
+
+    def test_unchanged_feed_is_served_without_queries(self):
+        response = self.client.get(reverse("feed-atom"))
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse("feed-atom"))
+            not_modified = self.client.get(
+                reverse("feed-atom"), HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+        # Private entries are in no feed, so editing one keeps the cache
+        self.private.title = "Still private"
+        self.private.save()
+        with self.assertNumQueries(0):
+            self.client.get(reverse("feed-atom"))
+
+    def test_entry_changes_rebuild_matching_feeds(self):
+        url = reverse("tag-feed-rss", args=["django"])
+        etag = self.client.get(url)["ETag"]
+        self.assertNotContains(
+            self.client.get(reverse("tag-feed-rss", args=["python"])), "Public post"
+        )
+
+        self.public.title = "Renamed post"
+        self.public.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Renamed post")
+
+        self.public.tags.add("python")
+        self.assertContains(
+            self.client.get(reverse("tag-feed-rss", args=["python"])), "Renamed post"
+        )
+
+        self.public.status = "PRIVATE"
+        self.public.save()
+        self.assertNotContains(self.client.get(url), "Renamed post")
+        self.assertNotContains(self.client.get(reverse("feed-rss")), "Renamed post")
+
+    def test_renaming_the_author_rebuilds_feeds(self):
+        url = reverse("feed-rss")
+        self.assertContains(self.client.get(url), "feeder")
+
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=["last_login"])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        self.author.username = "renamed"
+        self.author.save()
+        self.assertContains(self.client.get(url), "renamed")
+        response = self.client.get(reverse("author-feed-rss", args=["feeder"]))
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(
+            self.client.get(reverse("author-feed-rss", args=["renamed"])),
+            "Public post",
+        )
+
+
+class CommentBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="batch@example.com", password="pass", username="batcher"
+        )
+        cls.public = BlogEntry.objects.create(
+            title="Busy", content="c", author=cls.author, status="PUBLIC"
+        )
+        cls.private = BlogEntry.objects.create(
+            title="Hidden", content="c", author=cls.author
+        )
+        cls.quiet = BlogEntry.objects.create(
+            title="Quiet", content="c", author=cls.author, status="PUBLIC"
+        )
+        for i in range(5):
+            Comment.objects.create(
+                blog_entry=cls.public, author=cls.author, content=f"public {i}"
+            )
+        for i in range(2):
+            Comment.objects.create(
+                blog_entry=cls.private, author=cls.author, content=f"private {i}"
+            )
+
+    def get(self, client=None, **params):
+        return (client or APIClient()).get(reverse("comments-batch"), params)
+
+    def test_newest_comments_of_visible_entries_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.get(
+                id=f"{self.private.pk},{self.public.pk}",
+                slug=self.quiet.slug,
+                limit=2,
+            )
+        self.assertEqual(response.status_code, 200)
+        [group] = response.json()["entries"]
+        self.assertEqual(group["id"], self.public.pk)
+        self.assertEqual(group["slug"], self.public.slug)
+        self.assertEqual([c["comment_number"] for c in group["comments"]], [4, 5])
+        self.assertEqual(group["comments"][-1]["content"], "public 4")
+
+    def test_author_sees_own_entries_in_request_order(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = self.get(client, id=f"{self.private.pk},{self.public.pk}", limit=1)
+        self.assertEqual(
+            [group["id"] for group in response.json()["entries"]],
+            [self.private.pk, self.public.pk],
+        )
+
+    def test_fast_path_matches_serializers(self):
+        params = {"id": f"{self.public.pk}", "omit": "content_html"}
+        fast = self.get(**params).json()
+        with override_settings(BLOG_FAST_READS=False):
+            slow = self.get(**params).json()
+        self.assertEqual(fast, slow)
+        self.assertNotIn("content_html", fast["entries"][0]["comments"][0])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.get().status_code, 400)
+        self.assertEqual(self.get(id="abc").status_code, 400)
+        self.assertEqual(self.get(id=self.public.pk, limit=0).status_code, 400)
+        with override_settings(BLOG_COMMENT_BATCH_MAX_ENTRIES=1):
+            self.assertEqual(self.get(id="1,2").status_code, 400)
+
+
+@override_settings(
+    THROTTLE_ROUTES={"comments-by-entry-id": {"user": "2/min", "ip": "3/min"}}
+)
+class ThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f"throttle{i}@example.com", password="pass", username=f"t{i}"
+            )
+            for i in range(2)
+        ]
+        cls.entry = BlogEntry.objects.create(
+            title="Throttled", content="c", author=cls.users[0], status="PUBLIC"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(
+            reverse("comments-by-entry-id", args=[self.entry.pk]),
+            {"content": "hi"},
+            format="json",
+        )
+
+    def test_user_and_ip_buckets(self):
+        self.assertEqual(self.post(self.users[0]).status_code, 201)
+        self.assertEqual(self.post(self.users[0]).status_code, 201)
+        response = self.post(self.users[0])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+
+        # Another user still has tokens, but the shared IP runs out
+        self.assertEqual(self.post(self.users[1]).status_code, 201)
+        self.assertEqual(self.post(self.users[1]).status_code, 429)
+
+        # Reads aren't throttled by default
+        url = reverse("comments-by-entry-id", args=[self.entry.pk])
+        self.assertEqual(APIClient().get(url).status_code, 200)
+
+    def test_bucket_refills_over_the_period(self):
+        now = 1_000_000
+        with mock.patch.object(throttling, "_now_ms", side_effect=lambda: now):
+            with self.assertNumQueries(0):
+                self.assertEqual(throttling.take("throttle:test", "2/10s"), 0)
+                self.assertEqual(throttling.take("throttle:test", "2/10s"), 0)
+                self.assertEqual(throttling.take("throttle:test", "2/10s"), 5)
+            now += 5000
+            self.assertEqual(throttling.take("throttle:test", "2/10s"), 0)
+            self.assertGreater(throttling.take("throttle:test", "2/10s"), 0)
+            now += 60000
+            self.assertEqual(throttling.take("throttle:test", "2/10s"), 0)
+            self.assertEqual(throttling.take("throttle:test", "2/10s"), 0)
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate("10/min"), (10, 60))
+        self.assertEqual(throttling.parse_rate("5/hour"), (5, 3600))
+        self.assertEqual(throttling.parse_rate("3/30s"), (3, 30))
+        with self.assertRaises(ValueError):
+            throttling.parse_rate("often")
@@ -1,6 +1,14 @@
 from django.urls import path
+
+from . import async_views
+from .feeds import AUTHOR, SITE, TAG, feed_view
+from .async_views import with_async_reads
 from .views import (
+    BlogEntryExportView,
+    BlogEntryImportView,
+    BlogEntrySearchView,
     BlogEntryViewSet,
+    CommentBatchView,
     CommentViewSet,
 )
 
@@ -8,51 +16,89 @@ urlpatterns = [
     # Blog entry access patterns
     path(
         "id/<int:pk>/",
-        BlogEntryViewSet.as_view(
-            {
-                "get": "retrieve",
-                "put": "update",
-                "patch": "partial_update",
-                "delete": "destroy",
-            }
+        with_async_reads(
+            async_views.entry_detail,
+            BlogEntryViewSet.as_view(
+                {
+                    "get": "retrieve",
+                    "put": "update",
+                    "patch": "partial_update",
+                    "delete": "destroy",
+                }
+            ),
         ),
         name="entry-by-id",
     ),
     path(
         "slug/<str:slug>/",
-        BlogEntryViewSet.as_view(
-            {
-                "get": "retrieve",
-                "put": "update",
-                "patch": "partial_update",
-                "delete": "destroy",
-            }
+        with_async_reads(
+            async_views.entry_detail,
+            BlogEntryViewSet.as_view(
+                {
+                    "get": "retrieve",
+                    "put": "update",
+                    "patch": "partial_update",
+                    "delete": "destroy",
+                }
+            ),
         ),
         name="entry-by-slug",
     ),
     path(
         "short/<str:short_url_id>/",
-        BlogEntryViewSet.as_view(
-            {
-                "get": "retrieve",
-                "put": "update",
-                "patch": "partial_update",
-                "delete": "destroy",
-            }
+        with_async_reads(
+            async_views.entry_detail,
+            BlogEntryViewSet.as_view(
+                {
+                    "get": "retrieve",
+                    "put": "update",
+                    "patch": "partial_update",
+                    "delete": "destroy",
+                }
+            ),
         ),
         name="entry-by-short-url",
     ),
     # List/Create blog entries
     path(
         "",
-        BlogEntryViewSet.as_view({"get": "list", "post": "create"}),
+        with_async_reads(
+            async_views.entry_list,
+            BlogEntryViewSet.as_view({"get": "list", "post": "create"}),
+        ),
         name="entry-list",
     ),
+    # Full-text search over visible entries
+    path("search/", BlogEntrySearchView.as_view(), name="entry-search"),
+    # NDJSON bulk import of entries, tags and comments
+    path("import/", BlogEntryImportView.as_view(), name="entry-import"),
+    # Streaming NDJSON export
+    path("export/", BlogEntryExportView.as_view(), name="entry-export"),
+    # RSS / Atom feeds of public entries
+    path("feeds/rss/", feed_view(SITE, "rss"), name="feed-rss"),
+    path("feeds/atom/", feed_view(SITE, "atom"), name="feed-atom"),
+    path(
+        "feeds/author/<str:username>/rss/",
+        feed_view(AUTHOR, "rss"),
+        name="author-feed-rss",
+    ),
+    path(
+        "feeds/author/<str:username>/atom/",
+        feed_view(AUTHOR, "atom"),
+        name="author-feed-atom",
+    ),
+    path("feeds/tag/<slug:tag>/rss/", feed_view(TAG, "rss"), name="tag-feed-rss"),
+    path("feeds/tag/<slug:tag>/atom/", feed_view(TAG, "atom"), name="tag-feed-atom"),
+    # Newest comments of several entries at once
+    path("comments/", CommentBatchView.as_view(), name="comments-batch"),
     # Comment patterns for each blog entry access method
     # By ID
     path(
         "id/<int:blog_entry_pk>/comments/",
-        CommentViewSet.as_view({"get": "list", "post": "create"}),
+        with_async_reads(
+            async_views.comment_list,
+            CommentViewSet.as_view({"get": "list", "post": "create"}),
+        ),
         name="comments-by-entry-id",
     ),
     path(
@@ -70,7 +116,10 @@ urlpatterns = [
     # By slug
     path(
         "slug/<slug:blog_entry_slug>/comments/",
-        CommentViewSet.as_view({"get": "list", "post": "create"}),
+        with_async_reads(
+            async_views.comment_list,
+            CommentViewSet.as_view({"get": "list", "post": "create"}),
+        ),
         name="comments-by-entry-slug",
     ),
     path(
@@ -88,7 +137,10 @@ urlpatterns = [
     # By short URL
     path(
         "short/<str:blog_entry_short_url>/comments/",
-        CommentViewSet.as_view({"get": "list", "post": "create"}),
+        with_async_reads(
+            async_views.comment_list,
+            CommentViewSet.as_view({"get": "list", "post": "create"}),
+        ),
         name="comments-by-entry-short",
     ),
     path(
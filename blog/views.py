@@ -1,36 +1,167 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 
-from rest_framework import viewsets
+from rest_framework import generics, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .models import BlogEntry, Comment
-from .serializers import BlogEntrySerializer, CommentSerializer
+from . import cache as entry_cache
+from . import fastpath
+from .bulk import import_entries
+from .export import aexport_lines, export_lines, export_queryset
+from .conditional import (
+    comment_list_validators,
+    conditional_response,
+    entry_list_validators,
+    entry_validators,
+)
+from .models import BlogEntry, Comment, visible_entry_q
+from .serializers import (
+    BlogEntryListSerializer,
+    BlogEntrySerializer,
+    CommentSerializer,
+    is_selected,
+    parse_sparse_fieldset,
+)
 from .permissions import IsAdminOrAuthorOrReadOnly
+from .pagination import (
+    BlogEntryCursorPagination,
+    CommentCursorPagination,
+    SearchPagination,
+)
+from .parsers import NDJSONParser
+from .search import search_entries
 
 
-class BlogEntryViewSet(viewsets.ModelViewSet):
+# URL kwargs naming an entry, in the order get_lookup() checks them
+ENTRY_LOOKUPS = ("slug", "short_url_id", "pk")
+
+
+def visible_entries(user):
+    return (
+        BlogEntry.objects.visible_to(user)
+        .select_related("author")
+        .prefetch_related("tags")
+        .defer("search_vector")
+    )
+
+
+class SparseFieldsetViewMixin:
+    """
+    ?fields= / ?omit= support for read requests. Selected fields are passed
+    to the serializer, and ``deferrable_fields`` that won't be rendered are
+    left out of the SELECT.
+    """
+
+    deferrable_fields = ()
+    sparse_actions = ("list", "retrieve")
+
+    def get_sparse_fieldset(self):
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        return parse_sparse_fieldset(self.request.query_params)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.sparse_actions:
+            context["sparse_fieldset"] = self.get_sparse_fieldset()
+        return context
+
+    def defer_unselected(self, queryset):
+        fieldset = self.get_sparse_fieldset()
+        rendered = self.get_serializer_class().Meta.fields
+        deferred = [
+            name
+            for name in self.deferrable_fields
+            if name not in rendered or (fieldset and not is_selected(name, fieldset))
+        ]
+        return queryset.defer(*deferred) if deferred else queryset
+
+
+class BlogEntryViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = BlogEntrySerializer
     permission_classes = [IsAdminOrAuthorOrReadOnly]
+    pagination_class = BlogEntryCursorPagination
+    deferrable_fields = ("content", "content_html", "excerpt")
+    # Retrieve serializes every field for the entry cache and trims after
+    sparse_actions = ("list",)
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return BlogEntryListSerializer
+        return BlogEntrySerializer
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_authenticated:
-            return BlogEntry.objects.filter(
-                Q(status="PUBLIC") | Q(author=user)
-            ).distinct()
-        return BlogEntry.objects.filter(status="PUBLIC")
+        queryset = visible_entries(self.request.user)
+        if self.action == "list":
+            queryset = self.defer_unselected(queryset)
+            fieldset = self.get_sparse_fieldset()
+            if fieldset and not is_selected("tags", fieldset):
+                queryset = queryset.prefetch_related(None)
+        return queryset
 
-    def get_object(self):
-        queryset = self.get_queryset()
+    def get_lookup(self):
+        for lookup in ENTRY_LOOKUPS:
+            if lookup in self.kwargs:
+                return lookup, self.kwargs[lookup]
 
-        if "slug" in self.kwargs:
-            obj = get_object_or_404(queryset, slug=self.kwargs["slug"])
-        elif "short_url_id" in self.kwargs:
-            obj = get_object_or_404(queryset, short_url_id=self.kwargs["short_url_id"])
-        else:
-            obj = get_object_or_404(queryset, pk=self.kwargs["pk"])
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = entry_list_validators(queryset, request)
+
+        def build_response():
+            if fastpath.enabled():
+                builder = fastpath.entry_list_builder(self.get_sparse_fieldset())
+                page = self.paginate_queryset(
+                    builder.values(queryset, "id", "created_at")
+                )
+                rows = fastpath.attach_tags(
+                    builder.rows(page), [values["id"] for values in page], BlogEntry
+                )
+                return self.get_paginated_response(rows)
+
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        return conditional_response(request, etag, build_response)
 
+    def sparse_response(self, data):
+        fieldset = self.get_sparse_fieldset()
+        if fieldset:
+            data = {k: v for k, v in data.items() if is_selected(k, fieldset)}
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup, value = self.get_lookup()
+        cached = entry_cache.get_entry(lookup, value)
+        if cached is not None and (
+            cached["status"] == "PUBLIC" or cached["author_id"] == request.user.pk
+        ):
+            return conditional_response(
+                request, cached["etag"], lambda: self.sparse_response(cached["data"])
+            )
+
+        instance = self.get_object()
+        etag = entry_validators(instance)
+
+        def build_response():
+            serializer = self.get_serializer(instance)
+            entry_cache.set_entry(instance, serializer.data)
+            return self.sparse_response(serializer.data)
+
+        return conditional_response(request, etag, build_response)
+
+    def get_object(self):
+        lookup, value = self.get_lookup()
+        obj = get_object_or_404(self.get_queryset(), **{lookup: value})
         self.check_object_permissions(self.request, obj)
         return obj
 
@@ -39,28 +170,289 @@ class BlogEntryViewSet(viewsets.ModelViewSet):
         serializer.save(author=user)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class BlogEntrySearchView(generics.ListAPIView):
+    """
+    Ranked full-text search over the entries visible to the requesting user.
+    """
+
+    serializer_class = BlogEntryListSerializer
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "This query parameter is required."})
+        return search_entries(visible_entries(self.request.user), query)
+
+
+class BlogEntryImportView(APIView):
+    """
+    Bulk import of entries, tags and comments from an NDJSON body, one entry
+    per line. Staff may import on behalf of other users.
+    """
+
+    permission_classes = [IsAuthenticated]
+    parser_classes = [NDJSONParser]
+
+    def post(self, request):
+        result = import_entries(
+            request.data,
+            default_author=request.user,
+            allow_other_authors=request.user.is_staff,
+        )
+        return Response(result)
+
+
+class BlogEntryExportView(APIView):
+    """
+    Streaming NDJSON export of entries, tags and comments for backups and
+    reindexing. Filter with ?author=<username>, ?status= and ?since=<ISO
+    datetime> for incremental exports.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        status = params.get("status")
+        if status and status not in dict(BlogEntry.STATUS_CHOICES):
+            raise ValidationError({"status": f"Unknown status {status!r}."})
+        since = params.get("since")
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                raise ValidationError({"since": "Expected an ISO 8601 datetime."})
+
+        queryset = export_queryset(
+            author=params.get("author"), status=status, since=since
+        )
+        if isinstance(request._request, ASGIRequest):
+            lines = aexport_lines(queryset)
+        else:
+            lines = export_lines(queryset)
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+# Not needed when an entry is only loaded alongside one of its comments
+ENTRY_BODY_FIELDS = ("content", "content_html", "excerpt", "search_vector")
+
+
+class CommentViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAdminOrAuthorOrReadOnly]
+    pagination_class = CommentCursorPagination
     lookup_field = "comment_number"
+    deferrable_fields = ("content", "content_html")
 
-    def get_blog_entry(self):
-        lookup_params = {
-            "blog_entry_pk": "pk",
-            "blog_entry_slug": "slug",
-            "blog_entry_short_url": "short_url_id",
-        }
+    entry_lookups = {
+        "blog_entry_pk": "pk",
+        "blog_entry_slug": "slug",
+        "blog_entry_short_url": "short_url_id",
+    }
 
-        for kwarg, field in lookup_params.items():
+    def get_entry_lookup(self):
+        for kwarg, field in self.entry_lookups.items():
             if kwarg in self.kwargs:
-                return get_object_or_404(BlogEntry, **{field: self.kwargs[kwarg]})
-
+                return field, self.kwargs[kwarg]
         raise Http404("Blog entry not found")
 
+    def get_blog_entry(self):
+        """
+        The parent entry, fetched at most once per request (the view
+        instance lives for one request).
+        """
+        if not hasattr(self, "_blog_entry"):
+            field, value = self.get_entry_lookup()
+            self._blog_entry = get_object_or_404(
+                BlogEntry.objects.visible_to(self.request.user), **{field: value}
+            )
+        return self._blog_entry
+
     def get_queryset(self):
-        blog_entry = self.get_blog_entry()
-        return Comment.objects.filter(blog_entry=blog_entry)
+        if self.action in ("retrieve", "update", "partial_update", "destroy"):
+            # Single comment: check the entry through the join in get_object
+            queryset = (
+                Comment.objects.select_related("author", "blog_entry")
+                .defer(*(f"blog_entry__{name}" for name in ENTRY_BODY_FIELDS))
+                .filter(visible_entry_q(self.request.user, prefix="blog_entry__"))
+            )
+        else:
+            queryset = Comment.objects.filter(
+                blog_entry=self.get_blog_entry()
+            ).select_related("author")
+        if self.action in self.sparse_actions:
+            queryset = self.defer_unselected(queryset)
+        return queryset
+
+    def get_object(self):
+        field, value = self.get_entry_lookup()
+        obj = get_object_or_404(
+            self.get_queryset(),
+            **{
+                f"blog_entry__{field}": value,
+                "comment_number": self.kwargs["comment_number"],
+            },
+        )
+        self._blog_entry = obj.blog_entry
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = comment_list_validators(queryset, request)
+
+        def build_response():
+            if fastpath.enabled():
+                builder = fastpath.comment_builder(self.get_sparse_fieldset())
+                page = self.paginate_queryset(builder.values(queryset, "comment_number"))
+                return self.get_paginated_response(builder.rows(page))
+
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        return conditional_response(request, etag, build_response)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not fastpath.enabled():
+            return super().retrieve(request, *args, **kwargs)
+        instance = self.get_object()
+        builder = fastpath.comment_builder(self.get_sparse_fieldset())
+        return Response(builder.instance_row(instance))
 
     def perform_create(self, serializer):
         blog_entry = self.get_blog_entry()
         serializer.save(author=self.request.user, blog_entry=blog_entry)
+
+
+def latest_comments(user, limit, ids=(), slugs=(), short_url_ids=()):
+    """
+    The newest ``limit`` comments of each entry named by pk, slug or short
+    URL id that ``user`` may read, oldest first within each entry, in one
+    query: ROW_NUMBER() over each entry's comments, newest first.
+    """
+    return (
+        Comment.objects.filter(
+            Q(blog_entry_id__in=ids)
+            | Q(blog_entry__slug__in=slugs)
+            | Q(blog_entry__short_url_id__in=short_url_ids),
+            visible_entry_q(user, prefix="blog_entry__"),
+        )
+        .annotate(
+            entry_slug=F("blog_entry__slug"),
+            entry_short_url_id=F("blog_entry__short_url_id"),
+            recency=Window(
+                RowNumber(),
+                partition_by=F("blog_entry_id"),
+                order_by=F("comment_number").desc(),
+            ),
+        )
+        .filter(recency__lte=limit)
+        .order_by("blog_entry_id", "comment_number")
+    )
+
+
+class CommentBatchView(APIView):
+    """
+    The newest comments of many entries in one request. Name entries with
+    comma-separated ?id=, ?slug= and ?short= values and set ?limit= (per
+    entry). Entries come back in the order named, ids first, then slugs,
+    then short URLs; ones the user can't read, or without comments, are
+    left out. ?fields= / ?omit= apply to the comments.
+    """
+
+    entry_params = {"id": "ids", "slug": "slugs", "short": "short_url_ids"}
+
+    def get_entry_keys(self):
+        keys = {}
+        for param, name in self.entry_params.items():
+            values = [
+                value
+                for raw in self.request.query_params.getlist(param)
+                for value in raw.split(",")
+                if value
+            ]
+            if param == "id":
+                try:
+                    values = [int(value) for value in values]
+                except ValueError:
+                    raise ValidationError({"id": "Entry ids must be integers."})
+            keys[name] = values
+        count = sum(len(values) for values in keys.values())
+        if not count:
+            raise ValidationError(
+                {"non_field_errors": ["Name at least one entry by id, slug or short."]}
+            )
+        max_entries = getattr(settings, "BLOG_COMMENT_BATCH_MAX_ENTRIES", 50)
+        if count > max_entries:
+            raise ValidationError(
+                {"non_field_errors": [f"At most {max_entries} entries per request."]}
+            )
+        return keys
+
+    def get_limit(self):
+        max_limit = getattr(settings, "BLOG_COMMENT_BATCH_MAX_LIMIT", 20)
+        try:
+            limit = int(self.request.query_params.get("limit", 5))
+        except ValueError:
+            raise ValidationError({"limit": "Expected an integer."})
+        if not 1 <= limit <= max_limit:
+            raise ValidationError({"limit": f"Must be between 1 and {max_limit}."})
+        return limit
+
+    def get(self, request):
+        keys = self.get_entry_keys()
+        queryset = latest_comments(request.user, self.get_limit(), **keys)
+        fieldset = parse_sparse_fieldset(request.query_params)
+        if fastpath.enabled():
+            builder = fastpath.comment_builder(fieldset)
+            values = list(
+                builder.values(
+                    queryset,
+                    "blog_entry_id",
+                    "entry_slug",
+                    "entry_short_url_id",
+                    "comment_number",
+                )
+            )
+            rows = builder.rows(values)
+        else:
+            comments = list(queryset.select_related("author"))
+            values = [
+                {
+                    "blog_entry_id": comment.blog_entry_id,
+                    "entry_slug": comment.entry_slug,
+                    "entry_short_url_id": comment.entry_short_url_id,
+                }
+                for comment in comments
+            ]
+            rows = CommentSerializer(
+                comments, many=True, context={"sparse_fieldset": fieldset}
+            ).data
+
+        groups = {}
+        for value, row in zip(values, rows):
+            entry_id = value["blog_entry_id"]
+            if entry_id not in groups:
+                groups[entry_id] = {
+                    "id": entry_id,
+                    "slug": value["entry_slug"],
+                    "short_url_id": value["entry_short_url_id"],
+                    "comments": [],
+                }
+            groups[entry_id]["comments"].append(row)
+
+        order = [
+            *(("id", key) for key in keys["ids"]),
+            *(("slug", key) for key in keys["slugs"]),
+            *(("short_url_id", key) for key in keys["short_url_ids"]),
+        ]
+        position = {key: index for index, key in reversed(list(enumerate(order)))}
+
+        def requested_at(group):
+            return min(
+                position.get((field, group[field]), len(order))
+                for field in ("id", "slug", "short_url_id")
+            )
+
+        return Response({"entries": sorted(groups.values(), key=requested_at)})
@@ -11,6 +11,10 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.production')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Pooled (not persistent) database connections, see core/settings.py
+os.environ.setdefault('DJANGO_ASGI', '1')
+# Serve entry and comment reads from the native async views
+os.environ.setdefault('BLOG_ASYNC_READS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,18 @@
+"""
+Helpers shared by the bench_* management commands.
+"""
+
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def rolled_back(using=None):
+    """
+    Run the block in a transaction that is always rolled back, so a
+    benchmark leaves no rows behind.
+    """
+    with transaction.atomic(using=using):
+        yield
+        transaction.set_rollback(True, using=using)
@@ -0,0 +1,23 @@
+"""
+Whether the default cache is shared between worker processes.
+
+Several features keep state in the cache that every process must see:
+invalidations, version stamps and counters. With a per-process backend
+(LocMem, Dummy) they fall back to the database or skip caching.
+settings.CACHE_SHARED overrides the detection, e.g. True for a single
+process serving LocMem.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PER_PROCESS_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias="default"):
+    shared = getattr(settings, "CACHE_SHARED", None)
+    if shared is not None:
+        return shared
+    return not isinstance(caches[alias], PER_PROCESS_BACKENDS)
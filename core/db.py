@@ -0,0 +1,162 @@
+"""
+Read-replica routing.
+
+ReplicaRoutingMiddleware tracks each request in a contextvar, and
+ReplicaRouter sends its reads to one of settings.DATABASE_REPLICAS when:
+
+- the method is GET, HEAD or OPTIONS and the view lives in one of
+  REPLICA_VIEW_MODULES (blog and accounts; the admin stays on the primary),
+- nothing has been written on this request (select_for_update counts as a
+  write), and
+- the client hasn't written in the last DATABASE_REPLICA_PIN_SECONDS,
+  tracked with a cookie and, for authenticated users, a cache key.
+
+Everything else, including management commands and writes, uses "default".
+Wrap reads whose result outlives the request (cached renderings) in
+reading_from_primary(), since a lagging replica would be cached too.
+"""
+
+import contextvars
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import LazyObject
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+REPLICA_VIEW_MODULES = ("blog.", "accounts.")
+PIN_COOKIE = "db_primary"
+
+_state = contextvars.ContextVar("replica_routing", default=None)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def pin_seconds():
+    return getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 10)
+
+
+def _pin_key(user_id):
+    return f"db:primary-pin:{user_id}"
+
+
+def _authenticated_user_id(request):
+    # Only look at a user that authentication already resolved; evaluating
+    # a lazy session user here would query the database from the router.
+    user = request.__dict__.get("user")
+    if user is None or isinstance(user, LazyObject) or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.safe = request.method in SAFE_METHODS
+        self.replica_view = False
+        self.wrote = False
+        self.pinned = PIN_COOKIE in request.COOKIES
+        self.checked_user_id = None
+
+    def is_pinned(self):
+        if not self.pinned:
+            user_id = _authenticated_user_id(self.request)
+            if user_id is not None and user_id != self.checked_user_id:
+                self.checked_user_id = user_id
+                self.pinned = bool(cache.get(_pin_key(user_id)))
+        return self.pinned
+
+    def use_replica(self):
+        return (
+            self.safe
+            and self.replica_view
+            and not self.wrote
+            and not self.is_pinned()
+        )
+
+    def pin(self, response):
+        seconds = pin_seconds()
+        response.set_cookie(PIN_COOKIE, "1", max_age=seconds, httponly=True)
+        user_id = _authenticated_user_id(self.request)
+        if user_id is not None:
+            cache.set(_pin_key(user_id), True, timeout=seconds)
+
+
+@contextmanager
+def reading_from_primary():
+    """Send the current request's reads inside the block to the primary."""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    replica_view = state.replica_view
+    state.replica_view = False
+    try:
+        yield
+    finally:
+        state.replica_view = replica_view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and replicas() and state.use_replica():
+            return random.choice(replicas())
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is not None:
+            state.replica_view = view_func.__module__.startswith(REPLICA_VIEW_MODULES)
+
+    def finish(self, state, response):
+        if state.wrote:
+            state.pin(response)
+        return response
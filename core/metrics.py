@@ -0,0 +1,332 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+MetricsMiddleware records, per URL name and method, request latency, DB
+query count and DB time, serializer time and response size. Application
+caches count their hits and misses here too (registry.cache_lookup). Everything is
+kept in process memory behind one lock, and the per-request cost is a few
+perf_counter calls plus one contextvar lookup per query, so the middleware
+can stay on in production. With several worker processes each one serves
+its own numbers; scrape them individually or aggregate in Prometheus.
+
+The /metrics endpoint is only routed when METRICS_ENDPOINT is set, and
+requires "Authorization: Bearer <METRICS_TOKEN>" when a token is configured.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+UNRESOLVED = "<unresolved>"
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield _format_number(bound), cumulative
+        yield "+Inf", cumulative + self.counts[-1]
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.statuses = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+
+
+class RequestMetrics:
+    """Counters for the request being handled, reached via a contextvar."""
+
+    __slots__ = ("queries", "db_seconds", "serializer_seconds", "timing")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.timing = False
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._cache_lookups = {}
+
+    def record(self, route, method, status, seconds, request_metrics, size):
+        with self._lock:
+            metrics = self._routes.get((route, method))
+            if metrics is None:
+                metrics = self._routes[(route, method)] = RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(request_metrics.queries)
+            metrics.db_seconds += request_metrics.db_seconds
+            metrics.serializer_seconds += request_metrics.serializer_seconds
+            if size is not None:
+                metrics.response_size.observe(size)
+
+    def cache_lookup(self, name, hit):
+        key = (name, "hit" if hit else "miss")
+        with self._lock:
+            self._cache_lookups[key] = self._cache_lookups.get(key, 0) + 1
+
+    def cache_lookups(self, name):
+        with self._lock:
+            return {
+                "hits": self._cache_lookups.get((name, "hit"), 0),
+                "misses": self._cache_lookups.get((name, "miss"), 0),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._cache_lookups.clear()
+
+    def render(self):
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+            _counter(
+                lines,
+                "http_requests_total",
+                "Requests handled.",
+                [
+                    ({"view": view, "method": method, "status": str(status)}, count)
+                    for (view, method), metrics in routes
+                    for status, count in sorted(metrics.statuses.items())
+                ],
+            )
+            _histogram(
+                lines,
+                "http_request_duration_seconds",
+                "Request latency.",
+                routes,
+                "latency",
+            )
+            _histogram(
+                lines,
+                "http_request_db_queries",
+                "DB queries per request.",
+                routes,
+                "queries",
+            )
+            _counter(
+                lines,
+                "http_request_db_seconds_total",
+                "Time spent in DB queries.",
+                _route_samples(routes, "db_seconds"),
+            )
+            _counter(
+                lines,
+                "http_request_serializer_seconds_total",
+                "Time spent serializing and rendering response data.",
+                _route_samples(routes, "serializer_seconds"),
+            )
+            _histogram(
+                lines,
+                "http_response_size_bytes",
+                "Response body size.",
+                routes,
+                "response_size",
+            )
+            _counter(
+                lines,
+                "cache_lookups_total",
+                "Application cache lookups.",
+                [
+                    ({"cache": name, "result": result}, count)
+                    for (name, result), count in sorted(self._cache_lookups.items())
+                ],
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _route_samples(routes, attr):
+    return [
+        ({"view": view, "method": method}, getattr(metrics, attr))
+        for (view, method), metrics in routes
+    ]
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels):
+    return ",".join(
+        '{}="{}"'.format(
+            k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for k, v in labels.items()
+    )
+
+
+def _counter(lines, name, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in samples:
+        lines.append(f"{name}{{{_labels(labels)}}} {_format_number(value)}")
+
+
+def _histogram(lines, name, help_text, routes, attr):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (view, method), metrics in routes:
+        histogram = getattr(metrics, attr)
+        labels = {"view": view, "method": method}
+        total = 0
+        for bound, count in histogram.samples():
+            bucket_labels = _labels({**labels, "le": bound})
+            lines.append(f"{name}_bucket{{{bucket_labels}}} {count}")
+            total = count
+        route_labels = _labels(labels)
+        lines.append(f"{name}_sum{{{route_labels}}} {_format_number(histogram.sum)}")
+        lines.append(f"{name}_count{{{route_labels}}} {total}")
+
+
+registry = Registry()
+
+
+def _record_query(execute, sql, params, many, context):
+    request_metrics = _current.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_metrics.queries += 1
+        request_metrics.db_seconds += time.perf_counter() - start
+
+
+def install_query_recorder(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+@contextmanager
+def serializer_timer():
+    """
+    Add the time spent in the block to the current request's serializer
+    time. Nested timers only count the outermost block.
+    """
+    request_metrics = _current.get()
+    if request_metrics is None or request_metrics.timing:
+        yield
+        return
+    request_metrics.timing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_metrics.serializer_seconds += time.perf_counter() - start
+        request_metrics.timing = False
+
+
+class TimedSerializerMixin:
+    """Count to_representation toward the request's serializer time."""
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+def _response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _finish(self, request, response, start, request_metrics):
+        registry.record(
+            _route(request),
+            request.method,
+            response.status_code,
+            time.perf_counter() - start,
+            request_metrics,
+            _response_size(response),
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, start, request_metrics)
+        return response
+
+    async def __acall__(self, request):
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, start, request_metrics)
+        return response
+
+
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 load_dotenv()
@@ -30,6 +31,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Serve DRF's browsable API (HTML) alongside JSON
+BROWSABLE_API = DEBUG or bool(os.getenv("BROWSABLE_API"))
+
 ALLOWED_HOSTS = ["localhost"]
 
 CORS_ALLOW_CREDENTIALS = True
@@ -57,6 +61,9 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # Outermost, so latency covers the whole middleware stack
+    "core.metrics.MetricsMiddleware",
+    "core.db.ReplicaRoutingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -91,6 +98,17 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# "postgres" (default) or "sqlite" for a local database file, e.g. for
+# running the test suite
+DB_ENGINE = os.getenv("DB_ENGINE", "postgres")
+if DB_ENGINE not in ("postgres", "sqlite"):
+    raise ImproperlyConfigured(f"Unknown DB_ENGINE {DB_ENGINE!r}.")
+if DB_ENGINE == "postgres" and not os.getenv("POSTGRES_DBNAME"):
+    raise ImproperlyConfigured(
+        "POSTGRES_DBNAME is not set. Configure PostgreSQL, or set "
+        "DB_ENGINE=sqlite to use a local SQLite database."
+    )
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -102,6 +120,91 @@ DATABASES = {
     }
 }
 
+# Set by core/asgi.py. Under ASGI, sync database code runs in a thread per
+# request, so persistent connections are neither reused nor closed.
+SERVING_ASGI = bool(os.getenv("DJANGO_ASGI"))
+
+# POSTGRES_POOL=1/0 forces the pool on or off; by default ASGI pools.
+if os.getenv("POSTGRES_POOL", "1" if SERVING_ASGI else "") not in ("", "0"):
+    # psycopg's connection pool (needs psycopg[pool]); Django requires
+    # CONN_MAX_AGE = 0 with pooling.
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10")),
+        }
+    }
+elif SERVING_ASGI:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+else:
+    # Persistent connections, checked before reuse
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("POSTGRES_CONN_MAX_AGE", "60"))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Read replicas, one alias per host, e.g. POSTGRES_REPLICA_HOSTS=db-r1,db-r2
+REPLICA_HOSTS = os.getenv("POSTGRES_REPLICA_HOSTS", "")
+for i, host in enumerate(filter(None, REPLICA_HOSTS.split(","))):
+    DATABASES[f"replica_{i}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+
+# SQLITE_REPLICAS=N adds N replica databases (db.replica_<i>.sqlite3) for
+# trying out replica routing.
+if DB_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+    if os.getenv("SQLITE_REPLICAS"):
+        # Test mirrors need a database file they can open, not :memory:
+        DATABASES["default"]["TEST"] = {"NAME": BASE_DIR / "test_db.sqlite3"}
+    for i in range(int(os.getenv("SQLITE_REPLICAS", "0"))):
+        DATABASES[f"replica_{i}"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / f"db.replica_{i}.sqlite3",
+            "TEST": {"MIRROR": "default"},
+        }
+
+# GET/HEAD/OPTIONS queries from the blog and account views go to these
+# aliases, see core.db
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica_")]
+DATABASE_ROUTERS = ["core.db.ReplicaRouter"]
+
+# Seconds after a write during which the same client reads from the primary
+DATABASE_REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Invalidations, version stamps and throttle buckets live in the cache, so
+# every worker process must share it: set REDIS_URL in production. With the
+# per-process LocMem fallback, features that need a shared cache query the
+# database instead (see core.cache); CACHE_SHARED=True overrides that for
+# a single-process deployment.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+CACHE_SHARED = {"1": True, "0": False}.get(os.getenv("CACHE_SHARED", ""))
+
+# Seconds a serialized PUBLIC/UNLISTED entry stays in the retrieve cache
+BLOG_ENTRY_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -121,6 +224,35 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Preferred password hasher: "scrypt", "argon2" (needs argon2-cffi) or
+# "pbkdf2". Hashes made by the others, or with other costs, are upgraded
+# on the next login; compare candidates with manage.py bench_login.
+ACCOUNTS_PASSWORD_HASHER = os.getenv("ACCOUNTS_PASSWORD_HASHER", "scrypt")
+ACCOUNTS_SCRYPT_WORK_FACTOR = int(os.getenv("ACCOUNTS_SCRYPT_WORK_FACTOR", 2**14))
+ACCOUNTS_SCRYPT_BLOCK_SIZE = 8
+ACCOUNTS_SCRYPT_PARALLELISM = 1
+ACCOUNTS_ARGON2_TIME_COST = int(os.getenv("ACCOUNTS_ARGON2_TIME_COST", 2))
+ACCOUNTS_ARGON2_MEMORY_COST = int(os.getenv("ACCOUNTS_ARGON2_MEMORY_COST", 102400))
+ACCOUNTS_ARGON2_PARALLELISM = 8
+ACCOUNTS_PBKDF2_ITERATIONS = 1_000_000
+
+PASSWORD_HASHER_CHOICES = {
+    "scrypt": "accounts.hashers.ScryptPasswordHasher",
+    "argon2": "accounts.hashers.Argon2PasswordHasher",
+    "pbkdf2": "accounts.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CHOICES[ACCOUNTS_PASSWORD_HASHER],
+    *(
+        path
+        for name, path in PASSWORD_HASHER_CHOICES.items()
+        if name != ACCOUNTS_PASSWORD_HASHER
+    ),
+    # Verified and upgraded on login, never used for new hashes
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+
 AUTH_USER_MODEL = "accounts.CustomUser"
 
 # Internationalization
@@ -153,22 +285,91 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 3,
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
-        "rest_framework.renderers.BrowsableAPIRenderer",
-    ],
+        "core.renderers.FastJSONRenderer",
+    ]
+    + (["rest_framework.renderers.BrowsableAPIRenderer"] if BROWSABLE_API else []),
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
         # "rest_framework.authentication.SessionAuthentication",
         # "rest_framework.authentication.TokenAuthentication",
     ],
+    "DEFAULT_THROTTLE_CLASSES": ["core.throttling.RouteThrottle"],
+    # Trusted reverse proxies in front of us, for the per-IP throttle key
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "0")) or None,
+}
+
+# Token buckets per URL name, per authenticated user and per client IP;
+# see core.throttling. Rules cover unsafe methods unless "methods" is given.
+THROTTLE_ROUTES = {
+    # accounts/urls.py
+    "jwt-register": {"ip": "10/hour"},
+    "jwt-obtain": {"ip": "20/min"},
+    "jwt-refresh": {"ip": "60/min"},
+    "jwt-revoke": {"ip": "60/min"},
+    "jwt-verify": {"ip": "120/min"},
+    # blog/urls.py
+    "entry-list": {"user": "30/min", "ip": "60/min"},
+    "entry-by-id": {"user": "60/min"},
+    "entry-by-slug": {"user": "60/min"},
+    "entry-by-short-url": {"user": "60/min"},
+    "entry-import": {"user": "30/hour"},
+    "comments-by-entry-id": {"user": "20/min", "ip": "60/min"},
+    "comments-by-entry-slug": {"user": "20/min", "ip": "60/min"},
+    "comments-by-entry-short": {"user": "20/min", "ip": "60/min"},
+    "comment-detail-by-entry-id": {"user": "60/min"},
+    "comment-detail-by-entry-slug": {"user": "60/min"},
+    "comment-detail-by-entry-short": {"user": "60/min"},
 }
 
+# Entries per RSS/Atom feed, and how long an unchanged feed stays cached
+BLOG_FEED_ITEMS = 20
+BLOG_FEED_CACHE_TIMEOUT = 300
+
+# Upper bound for the ?page_size= query parameter on blog list endpoints
+BLOG_MAX_PAGE_SIZE = 100
+
+# Entries per request and ?limit= ceiling for the batched comments endpoint
+BLOG_COMMENT_BATCH_MAX_ENTRIES = 50
+BLOG_COMMENT_BATCH_MAX_LIMIT = 20
+
+# Build entry/comment list rows from values() instead of serializer objects
+BLOG_FAST_READS = True
+
+# Route /metrics (Prometheus text format); METRICS_TOKEN, when set, is
+# required as "Authorization: Bearer <token>"
+METRICS_ENDPOINT = bool(os.getenv("METRICS_ENDPOINT"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Serve entry/comment GETs from blog.async_views; core/asgi.py turns this on
+BLOG_ASYNC_READS = bool(os.getenv("BLOG_ASYNC_READS"))
+
+# Short URL id generator for new entries. PostgresSequenceShortIdGenerator
+# is also available; the block counter hands out this many ids per query.
+BLOG_SHORT_ID_GENERATOR = "blog.short_ids.BlockCounterShortIdGenerator"
+BLOG_SHORT_ID_BLOCK_SIZE = 100
+
+# Who runs blog.tasks background tasks: "thread" (in-process pool),
+# "sync" (right after commit) or "off" (only manage.py run_tasks)
+BLOG_TASKS_MODE = os.getenv("BLOG_TASKS_MODE", "thread")
+BLOG_TASK_WORKERS = 2
+BLOG_TASK_MAX_ATTEMPTS = 5
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=7),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
+    # Blacklist checks through the in-process index in accounts.cache
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.TokenRefreshSerializer",
+    "TOKEN_VERIFY_SERIALIZER": "accounts.serializers.TokenVerifySerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "accounts.serializers.TokenBlacklistSerializer",
 }
 
+# Seconds an authenticated user stays cached by CachedJWTAuthentication
+ACCOUNTS_USER_CACHE_TIMEOUT = 60
+# Seconds before a process reloads its token blacklist index regardless of
+# the version stamp in the cache
+ACCOUNTS_BLACKLIST_INDEX_TTL = 5
+
 APPEND_SLASH = True
 
 SPECTACULAR_SETTINGS = {
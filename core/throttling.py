@@ -0,0 +1,127 @@
+"""
+Per-route token-bucket throttling in the shared cache.
+
+settings.THROTTLE_ROUTES maps URL names to limits per authenticated user
+and per client IP::
+
+    THROTTLE_ROUTES = {
+        "jwt-obtain": {"ip": "10/min"},
+        "comments-by-entry-id": {"user": "20/min", "ip": "60/min"},
+        "entry-search": {"ip": "120/min", "methods": ["GET"]},
+    }
+
+A rate "N/period" (period s, min, hour or day, optionally with a count
+such as "30s") is a bucket of N tokens refilled evenly over the period.
+Rules apply to unsafe methods unless "methods" says otherwise.
+
+Buckets are kept as GCRA "theoretical arrival times" in milliseconds,
+advanced with cache.incr, so the check is atomic across processes on
+backends with atomic increments (Redis, Memcached, LocMem) and costs one
+or two cache round trips and no queries. Requests over the limit get a
+429 with Retry-After.
+"""
+
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+RATE_RE = re.compile(r"^(\d+)/(\d*)([smhd])[a-z]*$")
+
+
+def parse_rate(rate):
+    """Return (tokens, period seconds) for a rate such as "10/min"."""
+    match = RATE_RE.match(rate.replace(" ", ""))
+    if match is None:
+        raise ValueError(f"Invalid throttle rate {rate!r}")
+    tokens, count, unit = match.groups()
+    return int(tokens), int(count or 1) * PERIODS[unit]
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _interval_ms(rate):
+    tokens, period = parse_rate(rate)
+    return period * 1000 // tokens or 1
+
+
+def give_back(key, rate):
+    """Return a token taken from the bucket at ``key``."""
+    try:
+        cache.decr(key, _interval_ms(rate))
+    except ValueError:
+        pass
+
+
+def take(key, rate):
+    """
+    Take a token from the bucket at ``key``. Return 0 when granted, else
+    the seconds until the next token.
+    """
+    period = parse_rate(rate)[1]
+    period_ms = period * 1000
+    interval_ms = _interval_ms(rate)
+    now = _now_ms()
+    try:
+        tat = cache.incr(key, interval_ms)
+    except ValueError:
+        cache.add(key, now, timeout=period * 2)
+        tat = cache.incr(key, interval_ms)
+    if tat < now + interval_ms:
+        # Idle long enough for the bucket to be full; restart from now.
+        # Concurrent restarts can both add, which only errs on the strict side.
+        tat = cache.incr(key, now + interval_ms - tat)
+    if tat - now <= period_ms:
+        if tat - now > period_ms // 2:
+            # A busy bucket must outlive its period to keep its debt.
+            cache.touch(key, period * 2)
+        return 0
+    # Refund the rejected request so hammering doesn't push the bucket out
+    give_back(key, rate)
+    cache.touch(key, period * 2)
+    return (tat - now - period_ms) / 1000
+
+
+class RouteThrottle(BaseThrottle):
+    """Apply the THROTTLE_ROUTES rule of the resolved URL name."""
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return True
+        rule = getattr(settings, "THROTTLE_ROUTES", {}).get(match.view_name)
+        if rule is None or request.method not in rule.get("methods", UNSAFE_METHODS):
+            return True
+
+        buckets = []
+        user = getattr(request, "user", None)
+        if "user" in rule and user is not None and user.is_authenticated:
+            key = f"throttle:{match.view_name}:user:{user.pk}"
+            buckets.append((key, rule["user"]))
+        if "ip" in rule:
+            key = f"throttle:{match.view_name}:ip:{self.get_ident(request)}"
+            buckets.append((key, rule["ip"]))
+
+        taken = []
+        for key, rate in buckets:
+            wait = take(key, rate)
+            if wait:
+                # Rejected requests don't spend tokens from the other bucket
+                for taken_key, taken_rate in taken:
+                    give_back(taken_key, taken_rate)
+                self.retry_after = wait
+                return False
+            taken.append((key, rate))
+        return True
+
+    def wait(self):
+        return self.retry_after
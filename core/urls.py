@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import (
@@ -24,3 +25,8 @@ urlpatterns = [
         name="redoc",
     ),
 ]
+
+if settings.METRICS_ENDPOINT:
+    from core.metrics import metrics_view
+
+    urlpatterns.append(path("metrics", metrics_view, name="metrics"))